@@ -1,3 +1,3 @@
 #!/usr/bin/env python
 
-__all__ = ['color', 'grayscale', 'sstv', 'tests', 'examples']
+__all__ = ['batch', 'benchmark', 'clock', 'color', 'decoder', 'grayscale', 'incremental', 'modes', 'native', 'oscillator', 'parallel', 'plan', 'prepare', 'sstv', 'stream', 'vectorized', 'tests', 'examples']
@@ -1,25 +1,75 @@
 #!/usr/bin/env python
 
 from __future__ import print_function, division
-from PIL import Image
-from argparse import ArgumentParser
-from sys import stderr
-from pysstv import color, grayscale
+from argparse import Action, ArgumentParser
+from collections import OrderedDict
+from os import devnull, dup2, open as os_open, stat, O_WRONLY
+from stat import S_ISREG
+from sys import stderr, stdout
+from pysstv import modes, prepare
 
-SSTV_MODULES = [color, grayscale]
+FORMAT_WRITERS = {
+    'wav': 'write_wav_file',
+    'raw-s16le': 'write_raw_file',
+    'raw-f32le': 'write_float_file',
+}
+FORMAT_EXTENSIONS = {'wav': '.wav', 'raw-s16le': '.s16', 'raw-f32le': '.f32'}
+RESAMPLE_FILTERS = ('nearest', 'bicubic', 'lanczos')
 
 
 def main():
-    module_map = build_module_map()
     parser = ArgumentParser(
         description='Converts an image to an SSTV modulated WAV file.')
     parser.add_argument('img_file', metavar='image.png',
                         help='input image file name')
     parser.add_argument('wav_file', metavar='output.wav',
-                        help='output WAV file name')
+                        help='output file name, - for standard output')
+    add_options(parser)
+    args = parser.parse_args()
+    try:
+        mode = modes.find(args.mode)
+    except KeyError:
+        parser.error('unknown mode {0!r} (see --list-modes)'.format(args.mode))
+    try:
+        convert(args.img_file, args.wav_file, mode.load(), args)
+    except ValueError as e:
+        print(e, file=stderr)
+        raise SystemExit(1)
+    except BrokenPipeError:
+        discard_stdout()
+        raise SystemExit(1)
+
+
+def discard_stdout():
+    """redirects stdout to the null device after the reader went away,
+       keeping the interpreter from complaining about it again while
+       flushing stdout at exit"""
+    dup2(os_open(devnull, O_WRONLY), stdout.fileno())
+
+
+class ListModesAction(Action):
+    """prints the name, VIS code, size and duration of every mode"""
+
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            for info in modes.get_modes().values():
+                print(modes.format_mode(info))
+            stdout.flush()
+        except BrokenPipeError:
+            discard_stdout()
+            parser.exit(1)
+        parser.exit()
+
+
+def add_options(parser):
     parser.add_argument(
-        '--mode', dest='mode', default='MartinM1', choices=module_map,
+        '--mode', dest='mode', default='MartinM1',
         help='image mode (default: Martin M1)')
+    parser.add_argument('--list-modes', action=ListModesAction,
+                        help='list the available modes and exit')
     parser.add_argument('--rate', dest='rate', type=int, default=48000,
                         help='sampling rate (default: 48000)')
     parser.add_argument('--bits', dest='bits', type=int, default=16,
@@ -30,6 +80,11 @@ def main():
                         help='add FSKID at the end')
     parser.add_argument('--chan', dest='chan', type=int,
                         help='number of channels (default: mono)')
+    parser.add_argument('--format', dest='format', default='wav',
+                        choices=sorted(FORMAT_WRITERS),
+                        help='output format, raw-s16le always has 16 bits '
+                        'per sample, raw-f32le has floats between -1 and +1 '
+                        '(default: wav)')
     parser.add_argument('--resize', dest='resize', action='store_true',
                         help='resize the image to the correct size')
     parser.add_argument('--keep-aspect-ratio', dest='keep_aspect_ratio', action='store_true',
@@ -37,68 +92,62 @@ def main():
     parser.add_argument('--keep-aspect', dest='keep_aspect', action='store_true',
                         help='keep the original aspect ratio when resizing (not cut off excess pixels)')
     parser.add_argument('--resample', dest='resample', default='lanczos',
-                        choices=('nearest', 'bicubic', 'lanczos'),
+                        choices=RESAMPLE_FILTERS,
                         help='which resampling filter to use for resizing (see Pillow documentation)')
-    args = parser.parse_args()
-    image = Image.open(args.img_file)
-    mode = module_map[args.mode]
-    if args.resize and any(i != m for i, m in zip(image.size, (mode.WIDTH, mode.HEIGHT))):
-        resample = getattr(Image, args.resample.upper())
-        if args.keep_aspect_ratio or args.keep_aspect:
-            orig_ratio = image.width / image.height
-            mode_ratio = mode.WIDTH / mode.HEIGHT
-            crop = orig_ratio != mode_ratio
-        else:
-            crop = False
-        if crop:
-            t = orig_ratio < mode_ratio
-            if args.keep_aspect:
-                t = orig_ratio > mode_ratio
-            if t:
-                w = mode.WIDTH
-                h = int(w / orig_ratio)
-            else:
-                h = mode.HEIGHT
-                w = int(orig_ratio * h)
-        else:
-            w = mode.WIDTH
-            h = mode.HEIGHT
-        image = image.resize((w, h), resample)
-        if args.keep_aspect:
-            newbg = Image.new('RGB', (mode.WIDTH, mode.HEIGHT))
-            if t:
-                newbg.paste(image, (0, int((mode.HEIGHT/2)-(h/2))))
-            else:
-                newbg.paste(image, (int((mode.WIDTH/2)-(w/2)), 0))
-            image = newbg.copy()
-            crop = False
-        if crop:
-            x = (image.width - mode.WIDTH) / 2
-            y = (image.height - mode.HEIGHT) / 2
-            image = image.crop((x, y, mode.WIDTH + x, mode.HEIGHT + y))
-    elif not all(i >= m for i, m in zip(image.size, (mode.WIDTH, mode.HEIGHT))):
-        print(('Image must be at least {m.WIDTH} x {m.HEIGHT} pixels '
-               'for mode {m.__name__}').format(m=mode), file=stderr)
-        raise SystemExit(1)
-    s = mode(image, args.rate, args.bits)
+
+
+def convert(img_file, wav_file, mode, args):
+    """converts an image file to a WAV (or raw) file using the given mode
+       class, args holds the options defined by add_options()"""
+    image = prepare.open_image(img_file, mode, get_fit(args), args.resample)
+    s = mode(image, args.rate, 16 if args.format == 'raw-s16le' else args.bits)
     s.vox_enabled = args.vox
     if args.fskid:
         s.add_fskid_text(args.fskid)
     if args.chan:
         s.nchannels = args.chan
-    s.write_wav(args.wav_file)
+    write_output(s, wav_file, args.format)
 
 
-def build_module_map():
+def write_output(s, filename, fmt):
+    """writes the transmission of an SSTV instance to a file in one of
+       the FORMAT_WRITERS formats, a file name of - means standard output,
+       WAV files are memory mapped unless they're devices or pipes"""
+    write = getattr(s, FORMAT_WRITERS[fmt])
+    if filename == '-':
+        write(stdout.buffer)
+        stdout.buffer.flush()
+    elif fmt == 'wav' and is_regular_file(filename):
+        s.write_wav_mmap(filename)
+    else:
+        with open(filename, 'wb') as f:
+            write(f)
+
+
+def is_regular_file(filename):
+    """returns True if filename is a regular file or doesn't exist yet"""
     try:
-        from collections import OrderedDict
-        module_map = OrderedDict()
-    except ImportError:
-        module_map = {}
-    for module in SSTV_MODULES:
-        for mode in module.MODES:
-            module_map[mode.__name__] = mode
-    return module_map
+        return S_ISREG(stat(filename).st_mode)
+    except OSError:
+        return True
+
+
+def get_fit(args):
+    """returns the prepare.prepare_image() fit selected by the options"""
+    if not args.resize:
+        return None
+    if args.keep_aspect:
+        return 'pad'
+    if args.keep_aspect_ratio:
+        return 'crop'
+    return 'stretch'
+
+
+def build_module_map():
+    """returns an OrderedDict of every mode class by name, loading
+       all of them, see the modes module for looking up a single one"""
+    return OrderedDict((name, info.load())
+            for name, info in modes.get_modes().items())
 
 
 if __name__ == '__main__':
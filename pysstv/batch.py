@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+"""
+Converts many images in one invocation, on a pool of worker processes, so
+that interpreter startup and importing the mode modules are only paid once
+per worker instead of once per image.
+
+Jobs come either from image file names given on the command line, which
+share the options given there, or from a manifest file. Manifests are
+either CSV files with a header row or JSON lines files (one object per
+line), with an image column/key, an optional output column/key, and any of
+the options of the single image command line (mode, rate, bits, vox,
+fskid, chan, format, resize, keep_aspect_ratio, keep_aspect, resample) overriding
+the defaults given on the command line for that job.
+"""
+
+from __future__ import print_function, division
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path, cpu_count
+from sys import stderr
+from time import time
+import csv
+import json
+from pysstv import modes
+from pysstv.__main__ import (add_options, convert, FORMAT_EXTENSIONS,
+        RESAMPLE_FILTERS)
+
+INT_OPTIONS = ('rate', 'bits', 'chan')
+BOOL_OPTIONS = ('vox', 'resize', 'keep_aspect_ratio', 'keep_aspect')
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def main():
+    parser = ArgumentParser(
+        description='Converts many images to SSTV modulated WAV files.')
+    parser.add_argument('img_files', metavar='image.png', nargs='*',
+                        help='input image file names')
+    parser.add_argument('--manifest', dest='manifest',
+                        help='CSV or JSON lines file describing the jobs')
+    parser.add_argument('--output-dir', dest='output_dir', default='.',
+                        help='directory of output files without an explicit '
+                        'output name (default: current directory)')
+    parser.add_argument('--jobs', '-j', dest='jobs', type=int,
+                        default=cpu_count(),
+                        help='number of worker processes (default: number of CPUs)')
+    add_options(parser)
+    args = parser.parse_args()
+    jobs = [{'image': img_file} for img_file in args.img_files]
+    if args.manifest:
+        jobs.extend(read_manifest(args.manifest))
+    if not jobs:
+        parser.error('no images or manifest given')
+    failed = 0
+    for job, elapsed, error in run_jobs(jobs, args, args.jobs):
+        if error is None:
+            print('OK {0} -> {1} ({2}) {3:.3f}s'.format(
+                job.img_file, job.wav_file, job.mode, elapsed))
+        else:
+            failed += 1
+            print('FAILED {0} ({1}) {2:.3f}s: {3}'.format(
+                job.img_file, job.mode, elapsed, error), file=stderr)
+    print('{0} converted, {1} failed'.format(len(jobs) - failed, failed))
+    if failed:
+        raise SystemExit(1)
+
+
+def read_manifest(filename):
+    """returns the list of jobs (dicts) described by a manifest file,
+       JSON lines if the extension is .json or .jsonl, CSV otherwise,
+       lines that can't be parsed are returned as ValueError instances,
+       which make_job() raises, so they're reported as failed jobs"""
+    with open(filename) as f:
+        if path.splitext(filename)[1].lower() in ('.json', '.jsonl'):
+            return [parse_json_line(line, n)
+                    for n, line in enumerate(f, 1) if line.strip()]
+        return [{k: v for k, v in row.items() if v not in (None, '')}
+                for row in csv.DictReader(f)]
+
+
+def parse_json_line(line, n):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError('Line {0}: {1}'.format(n, e))
+
+
+def make_job(item, defaults):
+    """merges a manifest item into the parsed command line options,
+       raises ValueError if the item is invalid"""
+    if isinstance(item, ValueError):
+        raise item
+    if not isinstance(item, dict):
+        raise ValueError('Item {0!r} is not an object'.format(item))
+    if not item.get('image'):
+        raise ValueError('Missing image')
+    options = dict(vars(defaults))
+    for key, value in item.items():
+        key = key.replace('-', '_')
+        if isinstance(value, str):
+            if key in INT_OPTIONS:
+                value = int(value)
+            elif key in BOOL_OPTIONS:
+                value = value.lower() in TRUE_VALUES
+        options[key] = value
+    job = Namespace(**options)
+    try:
+        modes.find(job.mode)
+    except KeyError:
+        raise ValueError('Unknown mode {0!r}'.format(job.mode))
+    if job.format not in FORMAT_EXTENSIONS:
+        raise ValueError('Unknown format {0!r}, must be one of {1}'.format(
+            job.format, ', '.join(sorted(FORMAT_EXTENSIONS))))
+    if job.resample not in RESAMPLE_FILTERS:
+        raise ValueError('Unknown resample filter {0!r}, must be one of '
+                '{1}'.format(job.resample, ', '.join(RESAMPLE_FILTERS)))
+    job.img_file = options['image']
+    job.wav_file = options.get('output') or path.join(defaults.output_dir,
+            path.splitext(path.basename(job.img_file))[0] +
+            FORMAT_EXTENSIONS[job.format])
+    return job
+
+
+def run_jobs(items, defaults, workers):
+    """converts the images on a pool of processes, generates
+       (job, elapsed seconds, error message or None) tuples
+       in the order the jobs finish, invalid jobs and jobs writing the
+       same output file as an earlier job fail without being run"""
+    jobs = []
+    outputs = set()
+    for n, item in enumerate(items, 1):
+        try:
+            job = make_job(item, defaults)
+        except ValueError as e:
+            item = item if isinstance(item, dict) else {}
+            job = Namespace(img_file=item.get('image') or '(job {0})'.format(n),
+                    mode=item.get('mode', defaults.mode))
+            yield job, 0, '{0}: {1}'.format(type(e).__name__, e)
+            continue
+        output = path.normcase(path.abspath(job.wav_file))
+        if output in outputs:
+            yield job, 0, ('ValueError: Output {0} is written by an earlier '
+                    'job').format(job.wav_file)
+            continue
+        outputs.add(output)
+        jobs.append(job)
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            elapsed, error = future.result()
+            yield futures[future], elapsed, error
+
+
+def run_job(job):
+    start = time()
+    try:
+        convert(job.img_file, job.wav_file, modes.find(job.mode).load(), job)
+    except Exception as e:
+        return time() - start, '{0}: {1}'.format(type(e).__name__, e)
+    return time() - start, None
+
+
+if __name__ == '__main__':
+    main()
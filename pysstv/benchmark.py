@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks the stages of the SSTV pipeline for every mode.
+
+The run command times gen_freq_bits, gen_values, gen_samples and write_wav
+for each combination of the given modes, sample rates, bit depths, channel
+counts (only relevant to write_wav) and engines, and saves the results as
+JSON. Since every stage consumes the one before it, the time of a stage
+includes the time of the stages it builds upon. Each combination runs in a
+fresh worker process by default, so that the reported peak resident set
+size belongs to that combination only.
+
+The compare command reads a baseline and a current result file, and
+reports (and exits with a non-zero status on) combinations that got slower
+than the given threshold.
+"""
+
+from __future__ import print_function, division
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from os import remove
+from tempfile import mkstemp
+from time import perf_counter
+import json
+import platform
+import sys
+from pysstv import modes, vectorized
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+FORMAT_VERSION = 1
+
+
+def main():
+    parser = ArgumentParser(
+        description='Benchmarks SSTV generation for every mode.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    run = commands.add_parser('run', help='run benchmarks')
+    run.add_argument('--modes', type=csv_list, default=list(modes.get_modes()),
+                     help='comma separated list of modes (default: all)')
+    run.add_argument('--rates', type=csv_ints, default=[11025, 48000],
+                     help='comma separated sample rates (default: 11025,48000)')
+    run.add_argument('--bits', type=csv_ints, default=[8, 16],
+                     help='comma separated bits per sample (default: 8,16)')
+    run.add_argument('--channels', type=csv_ints, default=[1, 2],
+                     help='comma separated channel counts (default: 1,2)')
+    run.add_argument('--engines', type=csv_list, default=[default_engine()],
+                     help='comma separated engines (default: numpy if '
+                     'available, python otherwise)')
+    run.add_argument('--repeat', type=int, default=1,
+                     help='runs per stage, the fastest is kept (default: 1)')
+    run.add_argument('--output', default='benchmark.json',
+                     help='output JSON file (default: benchmark.json)')
+    compare = commands.add_parser('compare',
+                                  help='compare results to a baseline')
+    compare.add_argument('baseline', help='baseline JSON file')
+    compare.add_argument('current', help='current JSON file')
+    compare.add_argument('--threshold', type=float, default=0.1,
+                         help='allowed relative slowdown (default: 0.1)')
+    args = parser.parse_args()
+    if args.command == 'run':
+        results = run_benchmarks(args.modes, args.rates, args.bits,
+                args.channels, args.engines, args.repeat, report=print)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare_results(baseline, current, args.threshold,
+                report=print)
+        if regressions:
+            raise SystemExit(1)
+
+
+def run_benchmarks(modes, rates, bits_list, channels, engines, repeat=1,
+        isolate=True, report=None):
+    """runs every combination and returns the results as a JSON
+       serializable dict, report is called with a line for each result"""
+    records = []
+    for engine in engines:
+        for mode in modes:
+            for rate in rates:
+                for bits in bits_list:
+                    args = mode, rate, bits, channels, engine, repeat
+                    if isolate:
+                        with ProcessPoolExecutor(1) as executor:
+                            case = executor.submit(run_case, *args).result()
+                    else:
+                        case = run_case(*args)
+                    for record in case:
+                        if report is not None:
+                            report(format_record(record))
+                    records.extend(case)
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': getattr(vectorized.numpy, '__version__', None),
+        'results': records,
+    }
+
+
+def run_case(mode_name, rate, bits, channels, engine, repeat=1):
+    """times every stage for a single mode, rate, bits and engine"""
+    mode = modes.find(mode_name).load()
+    image = make_image(mode)
+
+    def measure(func, nchannels=1):
+        best = None
+        for _ in range(repeat):
+            s = mode(image, rate, bits, engine=engine)
+            s.preamble_cache = None
+            s.nchannels = nchannels
+            start = perf_counter()
+            result = func(s)
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    timings = [(stage, None) + measure(func) for stage, func in (
+        ('gen_freq_bits', lambda s: sum(1 for _ in s.gen_freq_bits())),
+        ('gen_values', lambda s: sum(map(len, s.gen_value_blocks()))),
+        ('gen_samples', lambda s: sum(map(len, s.gen_sample_blocks()))))]
+    timings.extend(('write_wav', nchannels) + measure(write_temp_wav,
+        nchannels) for nchannels in channels)
+    segments = timings[0][3]
+    samples = timings[1][3]
+    records = [make_record(mode_name, engine, rate, bits, nchannels, stage,
+        seconds, samples) for stage, nchannels, seconds, _ in timings]
+    records[0]['segments'] = segments
+    return records
+
+
+def make_record(mode, engine, rate, bits, channels, stage, seconds, samples):
+    duration = samples / rate
+    return {
+        'mode': mode,
+        'engine': engine,
+        'rate': rate,
+        'bits': bits,
+        'channels': channels,
+        'stage': stage,
+        'seconds': seconds,
+        'samples': samples,
+        'duration': duration,
+        'samples_per_sec': samples / seconds,
+        'realtime': duration / seconds,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def write_temp_wav(s):
+    fd, filename = mkstemp(suffix='.wav')
+    try:
+        with open(fd, 'wb') as f:
+            s.write_wav_file(f)
+    finally:
+        remove(filename)
+
+
+def make_image(mode):
+    """returns a deterministic image with gradients in every channel"""
+    from PIL import Image
+    size = mode.WIDTH, mode.HEIGHT
+    gradient = Image.linear_gradient('L')
+    return Image.merge('RGB', (gradient.resize(size),
+        gradient.rotate(90).resize(size),
+        Image.radial_gradient('L').resize(size)))
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def default_engine():
+    return 'python' if vectorized.numpy is None else 'numpy'
+
+
+def record_key(record):
+    return tuple(record[key] for key in
+            ('mode', 'engine', 'rate', 'bits', 'channels', 'stage'))
+
+
+def compare_results(baseline, current, threshold, report=None):
+    """returns the (baseline, current) record pairs of the current results
+       that are slower than the baseline by more than threshold (relative),
+       report is called with a line for each record present in both"""
+    baseline = {record_key(record): record for record in baseline['results']}
+    regressions = []
+    for record in current['results']:
+        old = baseline.get(record_key(record))
+        if old is None:
+            continue
+        change = record['seconds'] / old['seconds'] - 1
+        slower = change > threshold
+        if slower:
+            regressions.append((old, record))
+        if report is not None:
+            report('{0} {1} {2:+.1%}'.format(
+                'REGRESSION' if slower else 'ok', format_key(record), change))
+    return regressions
+
+
+def format_key(record):
+    return '{mode} {engine} {rate}Hz {bits}bit{ch} {stage}'.format(
+            ch='' if record['channels'] is None else
+            ' {0}ch'.format(record['channels']), **record)
+
+
+def format_record(record):
+    return ('{key}: {seconds:.3f}s {samples_per_sec:.0f} samples/s '
+            '{realtime:.1f}x realtime, peak RSS {peak_rss_kb} kB').format(
+                    key=format_key(record), **record)
+
+
+def csv_list(value):
+    return [item for item in value.split(',') if item]
+
+
+def csv_ints(value):
+    return [int(item) for item in csv_list(value)]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""
+Exact sample clock, an alternative to accumulating the fractional sample
+position of segments in floating point, selected by setting the
+sample_clock attribute of an SSTV instance (None, the default, means the
+floating point clock).
+
+Segment durations are converted to fractions with a bounded denominator
+(recovering values such as 1000 / 4800 ms exactly), and the sample
+boundary after each segment is the floor of the exact sum of the
+durations before it times the sample rate, kept as an integer remainder
+over the common denominator of the durations seen so far. So unlike with
+the floating point clock, rounding errors can't accumulate over long
+transmissions, and the number of samples is the same on every platform.
+The fractional carry between parts of a transmission is a Fraction.
+"""
+
+from __future__ import division
+from array import array
+from fractions import Fraction
+from math import gcd
+from pysstv import vectorized
+
+MAX_DENOMINATOR = 1000000
+INT64_LIMIT = 1 << 62
+
+
+class ExactClock(object):
+    def __init__(self, max_denominator=MAX_DENOMINATOR):
+        self.max_denominator = max_denominator
+
+    def __eq__(self, other):
+        return (isinstance(other, ExactClock) and
+                self.max_denominator == other.max_denominator)
+
+    def __hash__(self):
+        return hash((ExactClock, self.max_denominator))
+
+    def __repr__(self):
+        return 'ExactClock(max_denominator={0})'.format(self.max_denominator)
+
+    def step(self, msec, samples_per_sec):
+        """returns the exact number of samples of a segment as a Fraction"""
+        return (Fraction(msec).limit_denominator(self.max_denominator) *
+                samples_per_sec / 1000)
+
+    def counter(self, samples_per_sec, carry=0):
+        """returns a Counter starting with the given fractional carry"""
+        return Counter(self, samples_per_sec, carry)
+
+    def counts(self, msecs, samples_per_sec, carry=0):
+        """returns the sample counts of segments with the given durations
+           as an array('q') and the fractional carry after them, using
+           NumPy in bulk if it's available"""
+        counter = self.counter(samples_per_sec, carry)
+        numpy = vectorized.numpy
+        if numpy is not None:
+            msecs = numpy.asarray(msecs, dtype=float)
+            values, inverse = numpy.unique(msecs, return_inverse=True)
+            for value in values.tolist():
+                counter.add_step(value)
+            steps = [counter.steps[value] for value in values.tolist()]
+            if counter.rem + max(steps, default=0) * len(msecs) < INT64_LIMIT:
+                ends = numpy.cumsum(numpy.array(steps, dtype=numpy.int64)[
+                    inverse]) + counter.rem
+                bounds = ends // counter.den
+                counts = numpy.diff(bounds, prepend=0)
+                if len(ends):
+                    counter.rem = int(ends[-1] - bounds[-1] * counter.den)
+                return array('q', counts.astype(numpy.int64).tobytes()), \
+                        counter.carry
+        counts = array('q', map(counter.advance, msecs))
+        return counts, counter.carry
+
+
+class Counter(object):
+    """counts the samples of consecutive segments exactly"""
+
+    def __init__(self, clock, samples_per_sec, carry=0):
+        carry = Fraction(carry)
+        self.clock = clock
+        self.samples_per_sec = samples_per_sec
+        self.rem = carry.numerator
+        self.den = carry.denominator
+        self.steps = {}
+
+    def add_step(self, msec):
+        """returns the number of samples of a segment of msec length in
+           units of 1 / den, extending den if necessary"""
+        step = self.steps.get(msec)
+        if step is not None:
+            return step
+        fraction = self.clock.step(msec, self.samples_per_sec)
+        if self.den % fraction.denominator:
+            scale = fraction.denominator // gcd(self.den, fraction.denominator)
+            self.den *= scale
+            self.rem *= scale
+            self.steps = {key: value * scale
+                    for key, value in self.steps.items()}
+        step = fraction.numerator * (self.den // fraction.denominator)
+        self.steps[msec] = step
+        return step
+
+    def advance(self, msec):
+        """returns the number of samples of the next segment"""
+        step = self.steps.get(msec)
+        if step is None:
+            step = self.add_step(msec)
+        tx, self.rem = divmod(self.rem + step, self.den)
+        return tx
+
+    @property
+    def carry(self):
+        return Fraction(self.rem, self.den)
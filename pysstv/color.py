@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 from __future__ import division
+from pysstv import vectorized
 from pysstv.sstv import byte_to_freq, FREQ_BLACK, FREQ_WHITE, FREQ_VIS_START
-from pysstv.grayscale import GrayscaleSSTV
-from itertools import chain
+from pysstv.grayscale import GrayscaleSSTV, Slot
+from array import array
 from enum import Enum
+from operator import add
 
 
 class Color(Enum):
@@ -12,19 +14,18 @@ class Color(Enum):
     blue = 2
 
 
+# frequencies of the average of two bytes, indexed by their sum
+SUM_TO_FREQ = [byte_to_freq(value / 2) for value in range(511)]
+
+
 class ColorSSTV(GrayscaleSSTV):
-    def on_init(self):
-        self.pixels = self.image.convert('RGB').load()
+    IMAGE_MODE = 'RGB'
 
-    def encode_line(self, line):
+    def compile_line_template(self, line):
         msec_pixel = self.SCAN / self.WIDTH
-        image = self.pixels
         for color in self.COLOR_SEQ:
             yield from self.before_channel(color)
-            for col in range(self.WIDTH):
-                pixel = image[col, line]
-                freq_pixel = byte_to_freq(pixel[color.value])
-                yield freq_pixel, msec_pixel
+            yield Slot(color.value, msec_pixel)
             yield from self.after_channel(color)
 
     def before_channel(self, color):
@@ -94,21 +95,16 @@ class Robot36(ColorSSTV):
     PORCH = 1.5
     SYNC_PORCH = 3
     INTER_CH_FREQS = [None, FREQ_WHITE, FREQ_BLACK]
+    TEMPLATE_PERIOD = 2
+    IMAGE_MODE = 'YCbCr'
 
-    def on_init(self):
-        self.yuv = self.image.convert('YCbCr').load()
-
-    def encode_line(self, line):
-        pixels = [self.yuv[col, line] for col in range(self.WIDTH)]
+    def compile_line_template(self, line):
         channel = 2 - (line % 2)
-        y_pixel_time = self.Y_SCAN / self.WIDTH
-        uv_pixel_time = self.C_SCAN / self.WIDTH
-        return chain(
-                [(FREQ_BLACK, self.SYNC_PORCH)],
-                ((byte_to_freq(p[0]), y_pixel_time) for p in pixels),
-                [(self.INTER_CH_FREQS[channel], self.INTER_CH_GAP),
-                    (FREQ_VIS_START, self.PORCH)],
-                ((byte_to_freq(p[channel]), uv_pixel_time) for p in pixels))
+        return [(FREQ_BLACK, self.SYNC_PORCH),
+                Slot(0, self.Y_SCAN / self.WIDTH),
+                (self.INTER_CH_FREQS[channel], self.INTER_CH_GAP),
+                (FREQ_VIS_START, self.PORCH),
+                Slot(channel, self.C_SCAN / self.WIDTH)]
 
 
 class PasokonP3(ColorSSTV):
@@ -162,22 +158,53 @@ class PD90(ColorSSTV):
     SYNC = 20
     PORCH = 2.08
     PIXEL = 0.532
+    LINE_STEP = 2
+    IMAGE_MODE = 'YCbCr'
 
-    def gen_image_tuples(self):
-        yuv = self.image.convert('YCbCr').load()
-        for line in range(0, self.HEIGHT, 2):
-            yield from self.horizontal_sync()
-            yield FREQ_BLACK, self.PORCH
-            pixels0 = [yuv[col, line] for col in range(self.WIDTH)]
-            pixels1 = [yuv[col, line + 1] for col in range(self.WIDTH)]
-            for p in pixels0:
-                yield byte_to_freq(p[0]), self.PIXEL
-            for p0, p1 in zip(pixels0, pixels1):
-                yield byte_to_freq((p0[2] + p1[2]) / 2), self.PIXEL
-            for p0, p1 in zip(pixels0, pixels1):
-                yield byte_to_freq((p0[1] + p1[1]) / 2), self.PIXEL
-            for p in pixels1:
-                yield byte_to_freq(p[0]), self.PIXEL
+    def on_init(self):
+        super().on_init()
+        self.chroma_sums = {channel: sum_row_pairs(self.planes[index],
+            self.WIDTH) for channel, index in (('cb', 1), ('cr', 2))}
+
+    def compile_line_template(self, line):
+        """each line transmits two lines of the image, the luminance of
+           both and the chrominance averaged between them"""
+        return [(FREQ_BLACK, self.PORCH),
+                Slot('y0', self.PIXEL),
+                Slot('cr', self.PIXEL),
+                Slot('cb', self.PIXEL),
+                Slot('y1', self.PIXEL)]
+
+    def row_freqs(self, line, channel):
+        if channel == 'y0':
+            return super().row_freqs(line, 0)
+        if channel == 'y1':
+            return super().row_freqs(line + 1, 0)
+        start = line // 2 * self.WIDTH
+        return list(map(SUM_TO_FREQ.__getitem__,
+            self.chroma_sums[channel][start:start + self.WIDTH]))
+
+    def slot_sources(self, channel):
+        if channel == 'y0':
+            return ((0, 0),)
+        if channel == 'y1':
+            return ((0, 1),)
+        index = 2 if channel == 'cr' else 1
+        return ((index, 0), (index, 1))
+
+
+def sum_row_pairs(plane, width):
+    """returns the sums of the pixels of each pair of rows of a plane with
+       one byte per pixel, as an array of 16-bit integers, row by row"""
+    numpy = vectorized.numpy
+    if numpy is not None:
+        pairs = numpy.frombuffer(plane, numpy.uint8).reshape(-1, 2, width)
+        return array('H', pairs.sum(axis=1, dtype=numpy.uint16).tobytes())
+    step = 2 * width
+    even = b''.join(plane[lo:lo + width] for lo in range(0, len(plane), step))
+    odd = b''.join(plane[lo:lo + width]
+            for lo in range(width, len(plane), step))
+    return array('H', map(add, even, odd))
 
 
 class PD120(PD90):
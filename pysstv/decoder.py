@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+"""
+Reference demodulator for verifying rendered transmissions in a loopback,
+much faster than real time, without a radio or an external decoder.
+
+The instantaneous frequency of every sample is estimated from the phase
+difference of consecutive samples of the analytic signal, computed with
+NumPy FFTs over large overlapping blocks. The VIS header is found as the
+first place where a 300 ms leader tone is followed by a 30 ms start bit,
+both detected using running sums over the whole buffer, and its code
+selects the mode from the mode registry. The position of every pixel is
+then derived from the end of the VIS header and the line templates of the
+mode (the same timing constants used for encoding), and its value is the
+average frequency over the middle half of the pixel. Pixels are put into
+the planes given by the slot_sources of the mode, rows of chroma planes
+that aren't transmitted (like every other Cr and Cb row of Robot36) are
+copied from the nearest row that is.
+
+The decoded image can be compared to the source image using psnr(), and
+
+    $ python -m pysstv.decoder output.wav --image source.png --min-psnr 30
+
+exits with an error if the transmission can't be decoded or the PSNR is
+below the given threshold. NumPy is required.
+"""
+
+from __future__ import division, print_function
+from argparse import ArgumentParser
+from collections import namedtuple
+from contextlib import closing
+from math import log10, pi
+from sys import stderr
+import wave
+from pysstv import modes, vectorized
+from pysstv.sstv import (FREQ_BLACK, FREQ_RANGE, FREQ_SYNC, FREQ_VIS_BIT1,
+        FREQ_VIS_START, MSEC_VIS_BIT, MSEC_VIS_START)
+
+BLOCK_SIZE = 1 << 16
+BLOCK_MARGIN = 1024
+# maximum distance of a tone from its nominal frequency in Hz,
+# and the part of a tone that has to be within that distance
+TONE_TOLERANCE = 100
+TONE_RATIO = 0.8
+VIS_BITS = 10
+
+Decoded = namedtuple('Decoded', 'mode image vis_code vis_start')
+
+
+def require_numpy():
+    numpy = vectorized.numpy
+    if numpy is None:
+        raise ImportError('NumPy is required for decoding')
+    return numpy
+
+
+def decode_wav(filename, mode=None):
+    """decodes the first channel of a WAV file written by SSTV.write_wav,
+       see decode()"""
+    numpy = require_numpy()
+    with closing(wave.open(filename, 'rb')) as wav:
+        sampwidth = wav.getsampwidth()
+        rate = wav.getframerate()
+        nchannels = wav.getnchannels()
+        data = wav.readframes(wav.getnframes())
+    dtype = {1: numpy.int8, 2: '<i2'}[sampwidth]
+    samples = numpy.frombuffer(data, dtype)[::nchannels]
+    return decode(samples, rate, mode)
+
+
+def decode(samples, samples_per_sec, mode=None):
+    """decodes a transmission from samples (any sequence of numbers), and
+       returns a Decoded tuple with the mode class, the image in the
+       IMAGE_MODE of the mode, the VIS code and the index of the sample
+       where the VIS start bit begins, mode is taken from the VIS code if
+       it's None, raises ValueError if there's no valid VIS header"""
+    numpy = require_numpy()
+    freqs = instantaneous_frequency(numpy.asarray(samples, float),
+            samples_per_sec)
+    vis_start = find_vis(freqs, samples_per_sec)
+    vis_code = decode_vis(freqs, samples_per_sec, vis_start)
+    if mode is None:
+        mode = find_mode(vis_code)
+    image_start = vis_start + VIS_BITS * MSEC_VIS_BIT * samples_per_sec / 1000
+    image = decode_image(freqs, samples_per_sec, image_start, mode)
+    return Decoded(mode, image, vis_code, vis_start)
+
+
+def instantaneous_frequency(samples, samples_per_sec, block_size=BLOCK_SIZE):
+    """returns the frequency of the signal between each sample and the
+       next one in Hz, computed in blocks of block_size samples"""
+    numpy = require_numpy()
+    length = len(samples)
+    freqs = numpy.empty(length)
+    for lo in range(0, length, block_size):
+        hi = min(lo + block_size, length)
+        start = max(lo - BLOCK_MARGIN, 0)
+        z = analytic_signal(samples[start:min(hi + BLOCK_MARGIN, length)])
+        phases = numpy.angle(z[1:] * numpy.conj(z[:-1]))
+        phases = numpy.append(phases, phases[-1:])
+        freqs[lo:hi] = phases[lo - start:hi - start]
+    return freqs * (samples_per_sec / (2 * pi))
+
+
+def analytic_signal(x):
+    """returns the analytic signal of a real signal (as scipy's hilbert)"""
+    numpy = require_numpy()
+    n = len(x)
+    weights = numpy.zeros(n)
+    weights[0] = 1
+    if n % 2 == 0:
+        weights[n // 2] = 1
+    weights[1:(n + 1) // 2] = 2
+    return numpy.fft.ifft(numpy.fft.fft(x) * weights)
+
+
+def tone_ratios(freqs, freq):
+    """returns running sums of samples close to a frequency, the number
+       of those in samples[a:b] is sums[b] - sums[a]"""
+    numpy = require_numpy()
+    return numpy.concatenate(([0], numpy.cumsum(
+        numpy.abs(freqs - freq) < TONE_TOLERANCE)))
+
+
+def find_vis(freqs, samples_per_sec):
+    """returns the index of the first sample of the start bit after the
+       second leader tone of the VIS header"""
+    numpy = require_numpy()
+    spms = samples_per_sec / 1000
+    leader = int(MSEC_VIS_START * spms)
+    bit = int(MSEC_VIS_BIT * spms)
+    leaders = tone_ratios(freqs, FREQ_VIS_START)
+    syncs = tone_ratios(freqs, FREQ_SYNC)
+    edges = numpy.arange(leader, len(freqs) - bit)
+    found = numpy.flatnonzero(
+            (leaders[edges] - leaders[edges - leader] >= leader * TONE_RATIO) &
+            (syncs[edges + bit] - syncs[edges] >= bit * TONE_RATIO))
+    if not len(found):
+        raise ValueError('No VIS header found')
+    # the midpoint between the two tones is crossed right at the edge
+    coarse = edges[found[0]]
+    window = freqs[coarse:coarse + bit]
+    return coarse + int(numpy.argmax(window < (FREQ_VIS_START + FREQ_SYNC) / 2))
+
+
+def decode_vis(freqs, samples_per_sec, vis_start):
+    """returns the VIS code after the start bit at vis_start,
+       raises ValueError on parity errors"""
+    spms = samples_per_sec / 1000
+    bits = []
+    for n in range(1, 9):
+        lo = int(vis_start + (n + 0.25) * MSEC_VIS_BIT * spms)
+        hi = int(vis_start + (n + 0.75) * MSEC_VIS_BIT * spms)
+        bits.append(int(freqs[lo:hi].mean() < (FREQ_VIS_BIT1 + FREQ_SYNC) / 2))
+    if sum(bits) % 2:
+        raise ValueError('VIS parity error')
+    return sum(bit << n for n, bit in enumerate(bits[:7]))
+
+
+def find_mode(vis_code):
+    """returns the mode class with the given 7-bit VIS code"""
+    for info in modes.get_modes().values():
+        if info.vis_code & 0x7f == vis_code:
+            return info.load()
+    raise ValueError('Unknown VIS code 0x{0:02x}'.format(vis_code))
+
+
+def decode_image(freqs, samples_per_sec, image_start, mode):
+    """returns the image of a line based mode (a GrayscaleSSTV subclass)
+       transmitted starting at sample image_start (which may be fractional)"""
+    numpy = require_numpy()
+    from PIL import Image
+    sstv = mode(Image.new(mode.IMAGE_MODE, (mode.WIDTH, mode.HEIGHT)),
+            samples_per_sec, 16)
+    spms = samples_per_sec / 1000
+    slots = list(gen_slots(sstv))
+    pixels = numpy.arange(sstv.WIDTH)
+    starts = numpy.concatenate([image_start + (time + pixels * msec) * spms
+        for _, _, time, msec in slots])
+    lengths = numpy.repeat([msec * spms for _, _, _, msec in slots],
+            sstv.WIDTH)
+    lo = numpy.clip(numpy.rint(starts + lengths / 4).astype(int),
+            0, len(freqs) - 1)
+    hi = numpy.maximum(numpy.rint(starts + lengths * 3 / 4).astype(int),
+            lo + 1)
+    if hi[-1] > len(freqs):
+        raise ValueError('Transmission is truncated')
+    sums = numpy.concatenate(([0], numpy.cumsum(freqs)))
+    values = (sums[hi] - sums[lo]) / (hi - lo)
+    values = numpy.rint(numpy.clip((values - FREQ_BLACK) / FREQ_RANGE * 255,
+        0, 255)).astype(numpy.uint8).reshape(len(slots), sstv.WIDTH)
+    bands = len(Image.new(mode.IMAGE_MODE, (1, 1)).getbands())
+    planes = numpy.zeros((bands, sstv.HEIGHT, sstv.WIDTH), numpy.uint8)
+    written = numpy.zeros((bands, sstv.HEIGHT), bool)
+    for (line, sources, _, _), row in zip(slots, values):
+        for plane, delta in sources:
+            planes[plane, line + delta] = row
+            written[plane, line + delta] = True
+    for plane, rows in zip(planes, written):
+        fill_rows(plane, rows)
+    return Image.merge(mode.IMAGE_MODE, [Image.frombytes('L',
+        (sstv.WIDTH, sstv.HEIGHT), plane.tobytes()) for plane in planes])
+
+
+def gen_slots(sstv):
+    """generates (line, sources, msec offset, pixel msec) tuples for every
+       Slot of the image, offsets are relative to the start of the image"""
+    from pysstv.grayscale import Slot
+    time = 0
+    for line in range(0, sstv.HEIGHT, sstv.LINE_STEP):
+        for item in tuple(sstv.horizontal_sync()) + sstv.line_template(line):
+            if isinstance(item, Slot):
+                yield line, sstv.slot_sources(item.channel), time, item.msec
+                time += item.msec * sstv.WIDTH
+            else:
+                time += item[1]
+
+
+def fill_rows(plane, written):
+    """copies the nearest written row into every row of a plane that
+       wasn't written"""
+    numpy = require_numpy()
+    rows = numpy.flatnonzero(written)
+    if not len(rows) or len(rows) == len(written):
+        return
+    indices = numpy.clip(numpy.searchsorted(rows, numpy.arange(len(written))),
+            1, len(rows) - 1)
+    before = rows[indices - 1]
+    after = rows[indices]
+    nearest = numpy.where(numpy.arange(len(written)) - before <=
+            after - numpy.arange(len(written)), before, after)
+    plane[:] = plane[nearest]
+
+
+def psnr(reference, decoded):
+    """returns the peak signal to noise ratio of a decoded image compared
+       to a reference image of the same size in dB, both are compared in
+       RGB, identical images give infinity"""
+    numpy = require_numpy()
+    a, b = (numpy.asarray(image.convert('RGB'), float)
+            for image in (reference, decoded))
+    mse = numpy.mean((a - b) ** 2)
+    if mse == 0:
+        return float('inf')
+    return 10 * log10(255 ** 2 / mse)
+
+
+def main():
+    parser = ArgumentParser(
+        description='Decodes an SSTV modulated WAV file to verify it.')
+    parser.add_argument('wav_file', metavar='output.wav',
+                        help='WAV file written by pysstv')
+    parser.add_argument('--image', dest='image',
+                        help='source image to compute the PSNR against')
+    parser.add_argument('--fit', dest='fit', choices=('stretch', 'crop', 'pad'),
+                        help='how the source image was fitted to the mode, '
+                        'see prepare.prepare_image')
+    parser.add_argument('--min-psnr', dest='min_psnr', type=float,
+                        help='exit with an error below this PSNR in dB')
+    parser.add_argument('--save', dest='save',
+                        help='save the decoded image to this file')
+    args = parser.parse_args()
+    try:
+        decoded = decode_wav(args.wav_file)
+    except ValueError as e:
+        print('{0}: {1}'.format(args.wav_file, e), file=stderr)
+        raise SystemExit(1)
+    print('{0}: {1} (VIS 0x{2:02x} at sample {3})'.format(args.wav_file,
+        decoded.mode.__name__, decoded.vis_code, decoded.vis_start))
+    if args.save:
+        decoded.image.convert('RGB').save(args.save)
+    if args.image:
+        from PIL import Image
+        from pysstv.prepare import prepare_image
+        reference = prepare_image(Image.open(args.image), decoded.mode,
+                args.fit)
+        value = psnr(reference, decoded.image)
+        print('PSNR: {0:.2f} dB'.format(value))
+        if args.min_psnr is not None and value < args.min_psnr:
+            print('PSNR below {0} dB'.format(args.min_psnr), file=stderr)
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,14 +9,13 @@ Usage example: get_floats.py | play -r 44100 -t f32 -c 1 --norm -
 
 from PIL import Image
 from pysstv.grayscale import Robot8BW
-import struct, sys
+import sys
 
 def main():
     img = Image.open("160x120bw.png")
     sstv = Robot8BW(img, 44100, 16)
     sstv.vox_enabled = True
-    for value in sstv.gen_values():
-        sys.stdout.write(struct.pack('f', value))
+    sstv.write_float_file(sys.stdout.buffer)
 
 if __name__ == '__main__':
     main()
@@ -11,13 +11,13 @@ get_freq_bits.py | gen_values 44100 | play -r 44100 -t f32 -c 1 --norm -
 
 from PIL import Image
 from pysstv.color import MartinM1
-import struct, sys
+from pysstv.plan import Plan
+import sys
 
 def main():
     img = Image.open("320x256rgb.png")
     sstv = MartinM1(img, 44100, 16)
-    for freq, msec in sstv.gen_freq_bits():
-        sys.stdout.write(struct.pack('ff', freq, msec))
+    sys.stdout.buffer.write(Plan.from_sstv(sstv).tobytes())
 
 if __name__ == '__main__':
     main()
@@ -30,7 +30,7 @@ class AudioThread(Thread):
 
     def stop(self):
         if self.pas is not None:
-            self.pas.sampler = []
+            self.pas.stop()
             self.pas = None
 
 
@@ -3,25 +3,28 @@
 """
 Demonstrates playing the generated samples directly using PyAudio
 Tested on PyAudio 0.2.7 http://people.csail.mit.edu/hubert/pyaudio/
+
+Samples are rendered ahead on a worker thread, the callback only copies
+bytes that are already prepared. stop() can be called from another thread
+to end playback early.
 """
 
 
-from pysstv.sstv import SSTV
 from time import sleep
-from itertools import islice
-import struct, pyaudio
+import pyaudio
 
 class PyAudioSSTV(object):
     def __init__(self, sstv):
         self.pa = pyaudio.PyAudio()
         self.sstv = sstv
-        self.fmt = '<' + SSTV.BITS_TO_STRUCT[sstv.bits]
+        self.streamer = None
+        self.stopped = False
 
     def __del__(self):
         self.pa.terminate()
 
     def execute(self):
-        self.sampler = self.sstv.gen_samples()
+        self.streamer = self.sstv.stream()
         stream = self.pa.open(
                 format=self.pa.get_format_from_width(self.sstv.bits // 8),
                 channels=1, rate=self.sstv.samples_per_sec, output=True,
@@ -31,11 +34,22 @@ class PyAudioSSTV(object):
             sleep(0.5)
         stream.stop_stream()
         stream.close()
+        self.streamer.close()
+        if self.streamer.underruns:
+            print('{0} underruns'.format(self.streamer.underruns))
+
+    def stop(self):
+        """stops rendering and makes the stream complete with the next
+           callback, even if rendered samples are still buffered"""
+        self.stopped = True
+        if self.streamer is not None:
+            self.streamer.close()
 
     def callback(self, in_data, frame_count, time_info, status):
-        frames = ''.join(struct.pack(self.fmt, b)
-                for b in islice(self.sampler, frame_count))
-        return frames, pyaudio.paContinue
+        frames = self.streamer.read(frame_count)
+        return frames, (pyaudio.paComplete
+                if self.stopped or self.streamer.finished
+                else pyaudio.paContinue)
 
 
 def main():
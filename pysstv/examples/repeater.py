@@ -2,19 +2,36 @@
 
 """
 Simple repeater that monitors a single directory using inotify, and if
-an image appears, it tries to repeat it on using the PyAudio example,
-trying to match the mode used for receiving it. It can be tested by
-simply copying/linking images to the directory or suing an SSTV
-receiver such as slowrx or QSSTV.
+an image appears, it tries to repeat it on using PyAudio, trying to match
+the mode used for receiving it. It can be tested by simply copying/linking
+images to the directory or suing an SSTV receiver such as slowrx or QSSTV.
+
+Images are only picked up once they've been completely written (or moved
+into the directory), and images with the same contents as one repeated
+before are skipped. The inotify handler only queues file names, which are
+rendered on a pool of worker processes while the current transmission is
+playing. The audio callback only copies rendered bytes, and continues with
+the next transmission in the same callback if it's ready, so there's no
+gap between them.
 """
 
 
-from pyinotify import WatchManager, Notifier, ProcessEvent, IN_CREATE
-from .pyaudio_sstv import PyAudioSSTV
+from pyinotify import (WatchManager, Notifier, ProcessEvent,
+        IN_CLOSE_WRITE, IN_MOVED_TO)
 from pysstv.color import MartinM1, MartinM2, ScottieS1, ScottieS2
 from pysstv.grayscale import Robot8BW, Robot24BW
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from hashlib import sha1
+from io import BytesIO
+from os import path, cpu_count
+from queue import Queue
+from threading import Thread
 from PIL import Image
-from os import path
+import pyaudio
+
+RATE = 44100
+BITS = 16
 
 # matches the abbreviations used by slowrx and QSSTV
 MODE_MAP = {
@@ -27,20 +44,85 @@ MODE_MAP = {
         }
 
 class EventHandler(ProcessEvent):
-    def process_IN_CREATE(self, event):
-        filename = event.pathname
-        print('Found image', filename)
-        mode = get_module_for_filename(filename)
-        img = Image.open(filename)
-        if mode is None:
-            mode = get_module_for_image(img)
-        if mode is None:
-            print('No suitable mode found to repeat', filename)
-            return
-        print('Repeating image using', mode.__name__)
-        sstv = mode(img, 44100, 16)
-        sstv.vox_enabled = True
-        PyAudioSSTV(sstv).execute()
+    def my_init(self, events):
+        self.events = events
+
+    def process_IN_CLOSE_WRITE(self, event):
+        self.events.put(event.pathname)
+
+    process_IN_MOVED_TO = process_IN_CLOSE_WRITE
+
+class Repeater(object):
+    def __init__(self, workers):
+        self.events = Queue()
+        self.pool = ProcessPoolExecutor(workers)
+        self.pending = deque()
+        self.seen = set()
+        self.current = memoryview(b'')
+
+    def dispatch(self):
+        """takes file names from the event queue, skips duplicates, and
+           starts rendering the rest on the worker pool"""
+        while True:
+            filename = self.events.get()
+            try:
+                with open(filename, 'rb') as f:
+                    digest = sha1(f.read()).digest()
+            except IOError as e:
+                print('Cannot read', filename, e)
+                continue
+            if digest in self.seen:
+                print('Skipping already repeated image', filename)
+                continue
+            self.seen.add(digest)
+            print('Found image', filename)
+            self.pending.append((filename, self.pool.submit(render, filename)))
+
+    def next_transmission(self):
+        """returns the samples of the next transmission if it's already
+           rendered, None otherwise, never blocks"""
+        while self.pending and self.pending[0][1].done():
+            filename, future = self.pending.popleft()
+            try:
+                mode, samples = future.result()
+            except Exception as e:
+                print('Cannot repeat', filename, e)
+                continue
+            if mode is None:
+                print('No suitable mode found to repeat', filename)
+                continue
+            print('Repeating', filename, 'using', mode)
+            return memoryview(samples)
+
+    def callback(self, in_data, frame_count, time_info, status):
+        n = frame_count * BITS // 8
+        frames = bytearray()
+        while len(frames) < n:
+            if not self.current:
+                self.current = self.next_transmission()
+                if self.current is None:
+                    self.current = memoryview(b'')
+                    break
+            chunk = self.current[:n - len(frames)]
+            frames += chunk
+            self.current = self.current[len(chunk):]
+        frames += bytes(n - len(frames))
+        return bytes(frames), pyaudio.paContinue
+
+def render(filename):
+    """renders an image in a worker process, returns the name of the mode
+       and the raw samples, or None and None if no mode matches"""
+    mode = get_module_for_filename(filename)
+    img = Image.open(filename)
+    if mode is None:
+        mode = get_module_for_image(img)
+    if mode is None:
+        return None, None
+    sstv = mode(img, RATE, BITS)
+    sstv.vox_enabled = True
+    samples = BytesIO()
+    sstv.write_raw_file(samples)
+    return mode.__name__, samples.getvalue()
 
 def get_module_for_filename(filename):
     basename, _ = path.splitext(path.basename(filename))
@@ -59,15 +141,31 @@ def main():
     try:
         directory = argv[1]
     except IndexError:
-        print("Usage: {0} <directory>".format(argv[0]), file=stderr)
+        print("Usage: {0} <directory> [workers]".format(argv[0]), file=stderr)
     else:
-        watch(directory)
+        workers = int(argv[2]) if len(argv) > 2 else cpu_count()
+        watch(directory, workers)
 
-def watch(directory):
+def watch(directory, workers):
+    repeater = Repeater(workers)
+    dispatcher = Thread(target=repeater.dispatch)
+    dispatcher.daemon = True
+    dispatcher.start()
+    pa = pyaudio.PyAudio()
+    stream = pa.open(format=pa.get_format_from_width(BITS // 8),
+            channels=1, rate=RATE, output=True,
+            stream_callback=repeater.callback)
+    stream.start_stream()
     wm = WatchManager()
-    notifier = Notifier(wm, EventHandler())
-    wm.add_watch(directory, IN_CREATE)
-    notifier.loop()
+    notifier = Notifier(wm, EventHandler(events=repeater.events))
+    wm.add_watch(directory, IN_CLOSE_WRITE | IN_MOVED_TO)
+    try:
+        notifier.loop()
+    finally:
+        stream.stop_stream()
+        stream.close()
+        pa.terminate()
+        repeater.pool.shutdown()
 
 if __name__ == '__main__':
     main()
@@ -1,25 +1,107 @@
 #!/usr/bin/env python
 
 from __future__ import division
-from pysstv.sstv import SSTV, byte_to_freq
+from pysstv.sstv import SSTV, BYTE_TO_FREQ
+from collections import namedtuple
+from itertools import chain, repeat
+
+# a run of pixels in a line template, filled by row_freqs(line, channel)
+Slot = namedtuple('Slot', 'channel msec')
+
+LINE_TEMPLATES = {}
 
 
 class GrayscaleSSTV(SSTV):
+    LINE_STEP = 1
+    TEMPLATE_PERIOD = 1
+    # the color space the planes are extracted in
+    IMAGE_MODE = 'L'
+
     def on_init(self):
-        self.pixels = self.image.convert('LA').load()
+        self.planes = self.extract_planes(self.IMAGE_MODE)
+
+    def extract_planes(self, mode):
+        """converts the image once (unless it's already in that mode, see
+           prepare.prepare_image) and returns its bands as bytes objects
+           of WIDTH x HEIGHT pixels, one byte per pixel, row by row"""
+        image = self.image
+        if image.size != (self.WIDTH, self.HEIGHT):
+            image = image.crop((0, 0, self.WIDTH, self.HEIGHT))
+        if image.mode != mode:
+            image = image.convert(mode)
+        return [band.tobytes() for band in image.split()]
+
+    def row(self, line, channel):
+        start = line * self.WIDTH
+        return self.planes[channel][start:start + self.WIDTH]
 
     def gen_image_tuples(self):
-        for line in range(self.HEIGHT):
-            yield from self.horizontal_sync()
-            yield from self.encode_line(line)
+        for line in range(0, self.HEIGHT, self.LINE_STEP):
+            yield from self.gen_line_tuples(line)
+
+    def gen_image_sections(self):
+        if self.overrides_image_tuples():
+            yield 'image', None, self.gen_image_tuples()
+            return
+        for line in range(0, self.HEIGHT, self.LINE_STEP):
+            yield 'line', line, self.gen_line_tuples(line)
+
+    def overrides_image_tuples(self):
+        """returns True if a subclass generates the image on its own by
+           overriding gen_image_tuples, which can't be split into lines"""
+        return type(self).gen_image_tuples is not GrayscaleSSTV.gen_image_tuples
+
+    def gen_line_tuples(self, line):
+        return chain(self.horizontal_sync(), self.encode_line(line))
+
+    def gen_image_msecs(self):
+        if (self.overrides_image_tuples() or
+                type(self).gen_image_sections is not
+                GrayscaleSSTV.gen_image_sections or
+                type(self).encode_line is not GrayscaleSSTV.encode_line):
+            yield from super().gen_image_msecs()
+            return
+        for line in range(0, self.HEIGHT, self.LINE_STEP):
+            for _, msec in self.horizontal_sync():
+                yield msec
+            for item in self.line_template(line):
+                if isinstance(item, Slot):
+                    yield from repeat(item.msec, self.WIDTH)
+                else:
+                    yield item[1]
 
     def encode_line(self, line):
-        msec_pixel = self.SCAN / self.WIDTH
-        image = self.pixels
-        for col in range(self.WIDTH):
-            pixel = image[col, line]
-            freq_pixel = byte_to_freq(pixel[0])
-            yield freq_pixel, msec_pixel
+        for item in self.line_template(line):
+            if isinstance(item, Slot):
+                yield from zip(self.row_freqs(line, item.channel),
+                        repeat(item.msec))
+            else:
+                yield item
+
+    def line_template(self, line):
+        """returns the timing skeleton of a line as a tuple of (freq, msec)
+           tuples and Slot objects, compiled once per class (or per call
+           if the instance overrides class constants)"""
+        if self.overrides_constants():
+            return tuple(self.compile_line_template(line))
+        key = type(self), line % self.TEMPLATE_PERIOD
+        template = LINE_TEMPLATES.get(key)
+        if template is None:
+            template = tuple(self.compile_line_template(line))
+            LINE_TEMPLATES[key] = template
+        return template
+
+    def compile_line_template(self, line):
+        return [Slot(0, self.SCAN / self.WIDTH)]
+
+    def row_freqs(self, line, channel):
+        return list(map(BYTE_TO_FREQ.__getitem__, self.row(line, channel)))
+
+    def slot_sources(self, channel):
+        """returns the (plane, row offset) pairs of the pixels row_freqs
+           averages for a Slot channel, used by the native engine, which
+           must be overridden along with row_freqs"""
+        return ((channel, 0),)
 
 
 class Robot8BW(GrayscaleSSTV):
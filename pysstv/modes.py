@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""
+Registry of the available modes, with static metadata about each of them,
+so modes can be listed and looked up by name without importing the mode
+modules (and thus Pillow and NumPy), which only happens when a ModeInfo is
+loaded.
+
+Other packages can add modes through entry points in the pysstv.modes
+group, named after the mode, pointing to its class, for example
+
+    entry_points={'pysstv.modes': ['Foo = foo.modes:Foo']}
+
+Entry points are only looked at if a name isn't one of the built-in modes
+or when all modes are listed, their classes are loaded then to get their
+metadata. Modes can also be added at runtime by calling register().
+"""
+
+from __future__ import division
+from collections import namedtuple, OrderedDict
+from importlib import import_module
+import warnings
+
+ENTRY_POINT_GROUP = 'pysstv.modes'
+DURATION_RATE = 48000
+
+
+class ModeInfo(namedtuple('ModeInfo',
+        'name vis_code width height duration target')):
+    """metadata of a mode, duration is the length of a transmission in
+       seconds without VOX and FSKID, target is module:class"""
+
+    def load(self):
+        """imports and returns the class of the mode"""
+        module, _, name = self.target.partition(':')
+        return getattr(import_module(module), name)
+
+    @classmethod
+    def from_class(cls, mode, name=None):
+        """returns the metadata of a mode class, computing the duration
+           of a transmission of a blank image"""
+        from PIL import Image
+        sstv = mode(Image.new('RGB', (mode.WIDTH, mode.HEIGHT)),
+                DURATION_RATE, 16)
+        return cls(name or mode.__name__, mode.VIS_CODE, mode.WIDTH,
+                mode.HEIGHT, round(sstv.duration(), 2),
+                '{0}:{1}'.format(mode.__module__, mode.__qualname__))
+
+
+BUILTIN_MODES = OrderedDict((info.name, info) for info in [
+    ModeInfo('MartinM1', 0x2c, 320, 256, 115.20, 'pysstv.color:MartinM1'),
+    ModeInfo('MartinM2', 0x28, 160, 256, 58.97, 'pysstv.color:MartinM2'),
+    ModeInfo('ScottieS1', 0x3c, 320, 256, 110.53, 'pysstv.color:ScottieS1'),
+    ModeInfo('ScottieS2', 0x38, 160, 256, 72.00, 'pysstv.color:ScottieS2'),
+    ModeInfo('ScottieDX', 0x4c, 320, 256, 269.79, 'pysstv.color:ScottieDX'),
+    ModeInfo('Robot36', 0x08, 320, 240, 36.91, 'pysstv.color:Robot36'),
+    ModeInfo('PasokonP3', 0x71, 640, 496, 203.96, 'pysstv.color:PasokonP3'),
+    ModeInfo('PasokonP5', 0x72, 640, 496, 305.49, 'pysstv.color:PasokonP5'),
+    ModeInfo('PasokonP7', 0xf3, 640, 496, 407.01, 'pysstv.color:PasokonP7'),
+    ModeInfo('PD90', 0x63, 320, 256, 90.90, 'pysstv.color:PD90'),
+    ModeInfo('PD120', 0x5f, 640, 496, 127.01, 'pysstv.color:PD120'),
+    ModeInfo('PD160', 0x62, 512, 400, 161.79, 'pysstv.color:PD160'),
+    ModeInfo('PD180', 0x60, 640, 496, 187.96, 'pysstv.color:PD180'),
+    ModeInfo('PD240', 0x61, 640, 496, 248.91, 'pysstv.color:PD240'),
+    ModeInfo('PD290', 0x5e, 800, 616, 289.59, 'pysstv.color:PD290'),
+    ModeInfo('WraaseSC2120', 0x3f, 320, 256, 122.64,
+        'pysstv.color:WraaseSC2120'),
+    ModeInfo('WraaseSC2180', 0x37, 320, 256, 182.93,
+        'pysstv.color:WraaseSC2180'),
+    ModeInfo('Robot8BW', 0x02, 160, 120, 8.95, 'pysstv.grayscale:Robot8BW'),
+    ModeInfo('Robot24BW', 0x0a, 320, 240, 24.91,
+        'pysstv.grayscale:Robot24BW'),
+    ])
+
+# modes added by register() or entry points
+REGISTERED_MODES = OrderedDict()
+entry_points_loaded = False
+
+
+def register(mode, name=None):
+    """adds a mode class to the registry, returns its ModeInfo"""
+    info = ModeInfo.from_class(mode, name)
+    REGISTERED_MODES[info.name] = info
+    return info
+
+
+def find(name):
+    """returns the ModeInfo of a mode, raises KeyError if there's none"""
+    info = BUILTIN_MODES.get(name) or REGISTERED_MODES.get(name)
+    if info is None:
+        load_entry_points()
+        info = REGISTERED_MODES[name]
+    return info
+
+
+def get_modes():
+    """returns an OrderedDict of the ModeInfo of every mode by name"""
+    load_entry_points()
+    modes = OrderedDict(BUILTIN_MODES)
+    modes.update(REGISTERED_MODES)
+    return modes
+
+
+def load_entry_points():
+    """registers the modes of the pysstv.modes entry points once,
+       skipping (with a warning) the ones that can't be loaded"""
+    global entry_points_loaded
+    if entry_points_loaded:
+        return
+    entry_points_loaded = True
+    for entry_point in gen_entry_points():
+        if entry_point.name in BUILTIN_MODES:
+            continue
+        try:
+            register(entry_point.load(), entry_point.name)
+        except Exception as e:
+            warnings.warn('Cannot load mode {0} from {1}: {2}'.format(
+                entry_point.name, entry_point.value, e), RuntimeWarning)
+
+
+def gen_entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # Python < 3.8, only built-in and registered modes are available
+        return []
+    try:
+        return entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10
+        return entry_points().get(ENTRY_POINT_GROUP, [])
+
+
+def format_mode(info):
+    return '{0.name:<14} VIS 0x{0.vis_code:02x} {1:>9} {0.duration:7.2f}s'.format(
+            info, '{0.width}x{0.height}'.format(info))
@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+
+"""
+Native engine, selected by passing engine='native' to the constructor.
+
+For every line based mode (a GrayscaleSSTV subclass using line templates),
+generate() emits C source specialized to the mode: the timing skeleton of
+each line is unrolled with its frequencies and durations as constants, and
+pixel runs become loops that look up the frequency of each pixel (or of the
+average of two pixels for chroma averaged between lines) in a table. The
+kernel goes from the image planes to quantized samples, with the same
+floating point operations in the same order as the pure Python engine,
+including sin from the C library, the fractional sample carry and the
+dither cycle, so its output is identical to that of the python engine with
+the same dither_seed. The VOX tones, the VIS header and the FSKID are
+rendered by a generic segment loop of the same kernel.
+
+The kernel is compiled once with the C compiler named by the CC
+environment variable (cc by default) into a shared object, which is cached
+in the directory named by PYSSTV_CACHE (pysstv in the user cache directory
+by default), keyed by the mode and a hash of the source, which includes
+GENERATOR_VERSION, and loaded using ctypes. If there's no compiler, or
+compiling or loading fails, or the instance uses an oscillator, an exact
+sample clock or a bit depth other than 8 or 16, the python engine is used
+instead, with the same output.
+"""
+
+from __future__ import division
+from array import array
+from hashlib import sha1
+from math import pi
+from threading import Lock
+import ctypes
+import os
+import shutil
+import subprocess
+import tempfile
+import warnings
+from pysstv.grayscale import GrayscaleSSTV, Slot
+from pysstv.sstv import SSTV, Quantizer, byte_to_freq
+
+GENERATOR_VERSION = 1
+CFLAGS = ['-O2', '-shared', '-fPIC', '-ffp-contract=off']
+
+# loaded kernels (or None if they can't be built) per hash of the source,
+# which differs between instances of a mode overriding its timing
+KERNELS = {}
+KERNELS_LOCK = Lock()
+
+HEADER = '''\
+/* generated by pysstv.native version {version} for {mode} */
+#include <math.h>
+#include <stdint.h>
+
+#define WIDTH {width}
+
+struct state {{
+    double offset;
+    double carry;
+    int64_t position;
+}};
+
+struct params {{
+    double spms;
+    double factor;
+    double amp;
+    int64_t lowest;
+    int64_t highest;
+    const double *dither;
+    int64_t dither_length;
+    int64_t sampwidth;
+}};
+
+static int segment(struct state *st, const struct params *p, double freq,
+        double msec, void *out, int64_t *n, int64_t capacity)
+{{
+    double samples = st->carry + p->spms * msec;
+    int64_t tx = (int64_t)samples;
+    double freq_factor = freq * p->factor;
+    double offset = st->offset;
+    int64_t position = st->position;
+    int64_t i;
+    if (*n + tx > capacity)
+        return -1;
+    for (i = 0; i < tx; i++) {{
+        int64_t sample = (int64_t)(sin(i * freq_factor + offset) * p->amp +
+                p->dither[position]);
+        if (sample < p->lowest)
+            sample = p->lowest;
+        else if (sample > p->highest)
+            sample = p->highest;
+        if (p->sampwidth == 2)
+            ((int16_t *)out)[*n + i] = (int16_t)sample;
+        else
+            ((int8_t *)out)[*n + i] = (int8_t)sample;
+        if (++position == p->dither_length)
+            position = 0;
+    }}
+    st->carry = samples - tx;
+    st->offset = offset + tx * freq_factor;
+    st->position = position;
+    *n += tx;
+    return 0;
+}}
+
+int64_t render_segments(struct state *st, const struct params *p,
+        const double *freqs, const double *msecs, int64_t count, void *out,
+        int64_t capacity)
+{{
+    int64_t n = 0;
+    int64_t i;
+    for (i = 0; i < count; i++)
+        if (segment(st, p, freqs[i], msecs[i], out, &n, capacity))
+            return -1;
+    return n;
+}}
+'''
+
+RENDER_LINES = '''
+int64_t render_lines(struct state *st, const struct params *p,
+        const uint8_t *const *planes, int64_t first, int64_t stop,
+        void *out, int64_t capacity)
+{{
+    int64_t n = 0;
+    int64_t line;
+    for (line = first; line < stop; line += {step}) {{
+        switch (line % {period}) {{
+{cases}
+        }}
+    }}
+    return n;
+}}
+'''
+
+
+class State(ctypes.Structure):
+    _fields_ = [('offset', ctypes.c_double), ('carry', ctypes.c_double),
+            ('position', ctypes.c_int64)]
+
+
+class Params(ctypes.Structure):
+    _fields_ = [('spms', ctypes.c_double), ('factor', ctypes.c_double),
+            ('amp', ctypes.c_double), ('lowest', ctypes.c_int64),
+            ('highest', ctypes.c_int64),
+            ('dither', ctypes.POINTER(ctypes.c_double)),
+            ('dither_length', ctypes.c_int64),
+            ('sampwidth', ctypes.c_int64)]
+
+
+def supports(sstv):
+    """returns whether the native engine can render an SSTV instance"""
+    cls = type(sstv)
+    return (isinstance(sstv, GrayscaleSSTV) and
+            cls.gen_freq_bits is SSTV.gen_freq_bits and
+            cls.gen_image_tuples is GrayscaleSSTV.gen_image_tuples and
+            cls.gen_image_sections is GrayscaleSSTV.gen_image_sections and
+            cls.gen_line_tuples is GrayscaleSSTV.gen_line_tuples and
+            cls.encode_line is GrayscaleSSTV.encode_line and
+            issubclass(owner(cls, 'slot_sources'), owner(cls, 'row_freqs')) and
+            sstv.oscillator is None and sstv.sample_clock is None and
+            sstv.bits in (8, 16))
+
+
+def owner(cls, name):
+    """returns the class in the MRO of cls that defines an attribute"""
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return klass
+
+
+def get_kernel(sstv):
+    """returns the loaded kernel of the mode of an SSTV instance, building
+       it if it's not cached yet, or None if it can't be used"""
+    if not supports(sstv):
+        return None
+    source = generate(sstv)
+    key = sha1(source.encode()).hexdigest()
+    with KERNELS_LOCK:
+        if key not in KERNELS:
+            KERNELS[key] = build(sstv, source)
+        return KERNELS[key]
+
+
+def generate(sstv):
+    """returns the C source of the kernel of the mode of an SSTV instance"""
+    cls = type(sstv)
+    lines = [HEADER.format(version=GENERATOR_VERSION, mode=cls.__name__,
+        width=sstv.WIDTH)]
+    tables = set()
+    cases = []
+    for phase in range(sstv.TEMPLATE_PERIOD):
+        body = []
+        for item in tuple(sstv.horizontal_sync()) + sstv.line_template(phase):
+            if not isinstance(item, Slot):
+                freq, msec = item
+                body.append('if (segment(st, p, {0}, {1}, out, &n, '
+                        'capacity)) return -1;'.format(
+                            literal(freq), literal(msec)))
+                continue
+            sources = sstv.slot_sources(item.channel)
+            tables.add(len(sources))
+            pixels = ' + '.join('planes[{0}][(line + {1}) * WIDTH + x]'
+                    .format(plane, delta) for plane, delta in sources)
+            body.append('for (x = 0; x < WIDTH; x++) if (segment(st, p, '
+                    'FREQS_{0}[{1}], {2}, out, &n, capacity)) return -1;'
+                    .format(len(sources), pixels, literal(item.msec)))
+        lines.append('static int line_{0}(struct state *st, const struct '
+                'params *p, const uint8_t *const *planes, int64_t line, '
+                'void *out, int64_t *n_out, int64_t capacity)\n{{\n'
+                '    int64_t n = *n_out;\n    int x;\n    (void)x;'
+                .format(phase))
+        lines.extend('    ' + statement for statement in body)
+        lines.append('    *n_out = n;\n    return 0;\n}\n')
+        cases.append('        case {0}: if (line_{0}(st, p, planes, line, '
+                'out, &n, capacity)) return -1; break;'.format(phase))
+    for count in sorted(tables):
+        values = [byte_to_freq(total / count)
+                for total in range(255 * count + 1)]
+        lines.insert(1, 'static const double FREQS_{0}[{1}] = {{{2}}};\n'
+                .format(count, len(values), ', '.join(map(literal, values))))
+    lines.append(RENDER_LINES.format(step=sstv.LINE_STEP,
+        period=sstv.TEMPLATE_PERIOD, cases='\n'.join(cases)))
+    return '\n'.join(lines)
+
+
+def literal(value):
+    """returns an exact C literal of a number as a hexadecimal float"""
+    return float(value).hex()
+
+
+def cache_dir():
+    directory = os.environ.get('PYSSTV_CACHE')
+    if directory is None:
+        base = os.environ.get('XDG_CACHE_HOME',
+                os.path.join(os.path.expanduser('~'), '.cache'))
+        directory = os.path.join(base, 'pysstv')
+    return directory
+
+
+def find_compiler():
+    """returns the path of the C compiler, or None if there's none"""
+    return shutil.which(os.environ.get('CC', 'cc'))
+
+
+def build(sstv, source=None):
+    """compiles (unless it's cached on disk) and loads the kernel of the
+       mode of an SSTV instance from its source (generated if it's None),
+       returns None if it's not possible"""
+    compiler = find_compiler()
+    if compiler is None:
+        return None
+    if source is None:
+        source = generate(sstv)
+    digest = sha1('\n'.join([compiler] + CFLAGS + [source]).encode()
+            ).hexdigest()[:16]
+    directory = cache_dir()
+    filename = os.path.join(directory, '{0}-{1}{2}'.format(
+        type(sstv).__name__, digest, '.dll' if os.name == 'nt' else '.so'))
+    try:
+        if not os.path.exists(filename):
+            compile_kernel(compiler, source, directory, filename)
+        return load(filename)
+    except (OSError, subprocess.CalledProcessError) as e:
+        warnings.warn('Cannot build the native kernel of {0}, falling back '
+                'to the python engine: {1}'.format(type(sstv).__name__, e),
+                RuntimeWarning)
+        return None
+
+
+def compile_kernel(compiler, source, directory, filename):
+    """compiles source into filename, atomically, so concurrent builds
+       of the same kernel don't interfere"""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_source = tempfile.mkstemp('.c', dir=directory)
+    tmp_object = tmp_source[:-2] + '.tmp'
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(source)
+        subprocess.run([compiler] + CFLAGS + ['-o', tmp_object, tmp_source,
+            '-lm'], check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        os.replace(tmp_object, filename)
+    finally:
+        for name in (tmp_source, tmp_object):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+
+def load(filename):
+    kernel = ctypes.CDLL(filename)
+    kernel.render_segments.restype = ctypes.c_int64
+    kernel.render_segments.argtypes = [ctypes.POINTER(State),
+            ctypes.POINTER(Params), ctypes.c_void_p, ctypes.c_void_p,
+            ctypes.c_int64, ctypes.c_void_p, ctypes.c_int64]
+    kernel.render_lines.restype = ctypes.c_int64
+    kernel.render_lines.argtypes = [ctypes.POINTER(State),
+            ctypes.POINTER(Params), ctypes.POINTER(ctypes.c_char_p),
+            ctypes.c_int64, ctypes.c_int64, ctypes.c_void_p, ctypes.c_int64]
+    return kernel
+
+
+def gen_sample_blocks(sstv, kernel, block_size):
+    """generates the output of sstv.gen_sample_blocks() using a kernel
+       returned by get_kernel(), in arrays of at most block_size samples"""
+    quantizer = Quantizer(sstv.bits, sstv.dither_seed)
+    dither = array('d', quantizer.dither)
+    params = Params(sstv.samples_per_sec / 1000, 2 * pi / sstv.samples_per_sec,
+            quantizer.amp, quantizer.lowest, quantizer.highest,
+            ctypes.cast(dither.buffer_info()[0],
+                ctypes.POINTER(ctypes.c_double)),
+            quantizer.DITHER_LENGTH, sstv.bits // 8)
+    state = State(0, 0, 0)
+    renderer = Renderer(kernel, state, params, quantizer.typecode, block_size)
+    preamble = list(sstv.gen_vox_tuples()) if sstv.vox_enabled else []
+    preamble.extend(sstv.gen_vis_tuples())
+    yield from renderer.segments(preamble)
+    planes = (ctypes.c_char_p * len(sstv.planes))(*sstv.planes)
+    line_msec = max(sum(gen_line_msecs(sstv, phase))
+            for phase in range(sstv.TEMPLATE_PERIOD))
+    batch = max(1, int(block_size / (params.spms * line_msec)))
+    step = sstv.LINE_STEP
+    for first in range(0, sstv.HEIGHT, batch * step):
+        stop = min(first + batch * step, sstv.HEIGHT)
+        count = len(range(first, stop, step))
+        yield from renderer.lines(planes, first, stop,
+                count * line_msec, count)
+    yield from renderer.segments(list(sstv.gen_fskid_tuples()))
+
+
+def gen_line_msecs(sstv, phase):
+    """generates the durations of the segments of a line"""
+    for item in tuple(sstv.horizontal_sync()) + sstv.line_template(phase):
+        if isinstance(item, Slot):
+            yield item.msec * sstv.WIDTH
+        else:
+            yield item[1]
+
+
+class Renderer(object):
+    """calls a kernel with buffers large enough for its output"""
+
+    def __init__(self, kernel, state, params, typecode, block_size):
+        self.kernel = kernel
+        self.state = ctypes.byref(state)
+        self.params = params
+        self.typecode = typecode
+        self.block_size = block_size
+
+    def segments(self, freq_bits):
+        if not freq_bits:
+            return []
+        freqs = array('d', [freq for freq, _ in freq_bits])
+        msecs = array('d', [msec for _, msec in freq_bits])
+        out = self.allocate(sum(msecs), len(freq_bits))
+        return self.split(out, self.kernel.render_segments(self.state,
+            ctypes.byref(self.params), freqs.buffer_info()[0],
+            msecs.buffer_info()[0], len(freq_bits), out.buffer_info()[0],
+            len(out)))
+
+    def lines(self, planes, first, stop, msec, count):
+        out = self.allocate(msec, count)
+        return self.split(out, self.kernel.render_lines(self.state,
+            ctypes.byref(self.params), planes, first, stop,
+            out.buffer_info()[0], len(out)))
+
+    def allocate(self, msec, segments):
+        """returns an array surely large enough for segments of msec
+           milliseconds in total, including the fractional carry"""
+        size = int(self.params.spms * msec) + segments + 2
+        return array(self.typecode, bytes(size * array(self.typecode).itemsize))
+
+    def split(self, out, count):
+        if count < 0:
+            raise RuntimeError('Native kernel output buffer overflow')
+        del out[count:]
+        return [out[lo:lo + self.block_size]
+                for lo in range(0, count, self.block_size)]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""
+Renders transmissions on a pool of worker processes.
+
+The phase and the fractional sample carry at every segment boundary only
+depend on the segments before it, so Plan.schedule computes them up front
+without synthesizing anything. The transmission is then split into
+contiguous spans of segments, which are synthesized and quantized
+independently, and concatenated in order. Since every sample is computed
+the same way as by the single process engines, and the dither cycle
+position of each span is derived from its first sample index, the output
+is identical to that of SSTV.gen_sample_blocks with the same dither seed.
+For SSTV.write_wav_mmap, the workers write their spans directly into a
+memory map of the preallocated file instead of sending them back.
+"""
+
+from __future__ import division
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+from pysstv import vectorized
+from pysstv.plan import Plan
+from pysstv.sstv import (Quantizer, gen_blocks, gen_schedule_values,
+        interleave, join_blocks, little_endian)
+
+SPANS_PER_WORKER = 4
+
+
+def gen_sample_blocks(sstv, workers, block_size, plan=None):
+    """generates the output of sstv.gen_sample_blocks() using the given
+       number of worker processes, see SSTV.gen_value_blocks() for plan"""
+    with ProcessPoolExecutor(workers) as executor:
+        for samples in executor.map(render_span,
+                make_jobs(sstv, workers, block_size, plan)):
+            for lo in range(0, len(samples), block_size):
+                yield samples[lo:lo + block_size]
+
+
+def write_spans(sstv, workers, filename, offset, block_size, plan=None):
+    """renders the output of sstv.gen_sample_blocks() using the given
+       number of worker processes, each writing its spans directly into
+       a memory map of an existing file (large enough to hold them),
+       starting at the given byte offset, in little endian byte order"""
+    frame_size = sstv.nchannels * (sstv.bits // 8)
+    jobs = [(filename, offset + job[3] * frame_size, sstv.nchannels, job)
+            for job in make_jobs(sstv, workers, block_size, plan)]
+    with ProcessPoolExecutor(workers) as executor:
+        for _ in executor.map(write_span, jobs):
+            pass
+
+
+def make_jobs(sstv, workers, block_size, plan=None):
+    """returns the render_span() jobs of a transmission"""
+    if plan is None:
+        plan = Plan.from_sstv(sstv)
+    schedule = plan.schedule(sstv.samples_per_sec,
+            clock=sstv.sample_clock)
+    quantizer = Quantizer(sstv.bits, sstv.dither_seed)
+    use_numpy = sstv.use_numpy()
+    return [(schedule.freq_factors[lo:hi], schedule.counts[lo:hi],
+        schedule.phases[lo:hi], start, quantizer, use_numpy,
+        sstv.oscillator, block_size)
+        for lo, hi, start in split(schedule.counts,
+            workers * SPANS_PER_WORKER)]
+
+
+def split(counts, spans):
+    """returns (lo, hi, start) tuples of contiguous segment ranges with
+       roughly the same number of samples, start is the index of the
+       first sample of the range"""
+    total = sum(counts)
+    result = []
+    lo = 0
+    start = 0
+    samples = 0
+    for n, count in enumerate(counts):
+        samples += count
+        if samples * spans >= total * (len(result) + 1):
+            result.append((lo, n + 1, start))
+            lo = n + 1
+            start = samples
+    if lo < len(counts):
+        result.append((lo, len(counts), start))
+    return result
+
+
+def render_span(job):
+    """synthesizes and quantizes a span of segments in a worker process"""
+    (freq_factors, counts, phases, start, quantizer,
+            use_numpy, oscillator, block_size) = job
+    quantizer.position = start % quantizer.DITHER_LENGTH
+    if use_numpy:
+        numpy = vectorized.numpy
+        blocks = vectorized.render(numpy.asarray(freq_factors),
+                numpy.asarray(counts), numpy.asarray(phases), block_size,
+                oscillator)
+    else:
+        values = gen_schedule_values(freq_factors, counts, phases, oscillator)
+        blocks = gen_blocks(values, 'd', block_size)
+    return join_blocks(list(map(quantizer.quantize, blocks)),
+            quantizer.typecode)
+
+
+def write_span(job):
+    """renders a span in a worker process and writes it into a memory
+       map of a file at the given byte position"""
+    filename, position, nchannels, span = job
+    data = memoryview(little_endian(interleave(render_span(span),
+        nchannels))).cast('B')
+    with open(filename, 'r+b') as f, mmap.mmap(f.fileno(), 0) as m:
+        m[position:position + len(data)] = data
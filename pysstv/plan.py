@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+"""
+Transmission plans hold the whole (freq, msec) schedule generated by
+SSTV.gen_freq_bits as two contiguous arrays, so that it can be stored,
+cached and synthesized without handling millions of tuples.
+"""
+
+from __future__ import division
+from array import array
+from collections import namedtuple
+from itertools import islice
+from math import pi
+
+# a part of the plan, freqs[start:stop] and msecs[start:stop] belong to it
+Section = namedtuple('Section', 'kind line start stop')
+
+# per segment angular frequencies (radians per sample), sample counts and
+# starting phases, and the phase and fractional sample carry after the end
+Schedule = namedtuple('Schedule', 'freq_factors counts phases offset carry')
+
+# the index of a segment, the index of its first sample, and the phase and
+# fractional sample carry at its start
+Position = namedtuple('Position', 'segment sample offset carry')
+
+
+class Plan(object):
+    def __init__(self):
+        self.freqs = array('d')
+        self.msecs = array('d')
+        self.sections = []
+
+    @classmethod
+    def from_sstv(cls, sstv):
+        """builds the plan of the whole transmission of an SSTV instance"""
+        return cls.from_sections(sstv.gen_sections())
+
+    @classmethod
+    def from_sections(cls, sections):
+        """builds a plan from (kind, line, tuples) triplets
+           such as the ones generated by SSTV.gen_sections"""
+        plan = cls()
+        for kind, line, tuples in sections:
+            plan.add_section(kind, line, tuples)
+        return plan
+
+    @classmethod
+    def gen_partial(cls, sections, segments):
+        """generates consecutive plans of the given number of segments
+           (except for the last one) from (kind, line, tuples) triplets,
+           sections longer than that are split between plans"""
+        plan = cls()
+        for kind, line, tuples in sections:
+            tuples = iter(tuples)
+            while True:
+                plan.add_section(kind, line,
+                        islice(tuples, segments - len(plan)))
+                if len(plan) < segments:
+                    break
+                yield plan
+                plan = cls()
+        if len(plan):
+            yield plan
+
+    @classmethod
+    def frombytes(cls, data):
+        """builds a plan from the output of tobytes(), the result
+           has a single section of kind 'other'"""
+        pairs = array('f')
+        pairs.frombytes(data)
+        plan = cls()
+        plan.freqs = array('d', pairs[0::2])
+        plan.msecs = array('d', pairs[1::2])
+        plan.sections.append(Section('other', None, 0, len(plan)))
+        return plan
+
+    def add_section(self, kind, line, tuples):
+        """appends (freq, msec) tuples to the plan as a new section"""
+        start = len(self.freqs)
+        add_freq = self.freqs.append
+        add_msec = self.msecs.append
+        for freq, msec in tuples:
+            add_freq(freq)
+            add_msec(msec)
+        self.sections.append(Section(kind, line, start, len(self.freqs)))
+
+    def slice(self, start, stop=None):
+        """returns a new plan of the segments from start to stop, with the
+           sections clipped to this range and their indices adjusted"""
+        stop = len(self) if stop is None else stop
+        plan = Plan()
+        plan.freqs = self.freqs[start:stop]
+        plan.msecs = self.msecs[start:stop]
+        plan.sections = [Section(section.kind, section.line,
+            max(section.start, start) - start,
+            min(section.stop, stop) - start)
+            for section in self.sections
+            if section.start < stop and section.stop > start]
+        return plan
+
+    def schedule(self, samples_per_sec, offset=0, carry=0, clock=None):
+        """maps the segments to samples the same way as SSTV.gen_values,
+           starting from the given phase and fractional sample carry,
+           clock is an optional clock.ExactClock"""
+        factor = 2 * pi / samples_per_sec
+        freq_factors = array('d')
+        phases = array('d')
+        add_freq_factor = freq_factors.append
+        add_phase = phases.append
+        if clock is not None:
+            counts, carry = clock.counts(self.msecs, samples_per_sec, carry)
+            for freq, tx in zip(self.freqs, counts):
+                freq_factor = freq * factor
+                add_freq_factor(freq_factor)
+                add_phase(offset)
+                offset += tx * freq_factor
+            return Schedule(freq_factors, counts, phases, offset, carry)
+        spms = samples_per_sec / 1000
+        counts = array('q')
+        add_count = counts.append
+        for freq, msec in zip(self.freqs, self.msecs):
+            carry += spms * msec
+            tx = int(carry)
+            freq_factor = freq * factor
+            add_freq_factor(freq_factor)
+            add_count(tx)
+            add_phase(offset)
+            offset += tx * freq_factor
+            carry -= tx
+        return Schedule(freq_factors, counts, phases, offset, carry)
+
+    def position(self, segment, samples_per_sec, clock=None):
+        """returns the Position of the start of the given segment, computed
+           from the segments before it without synthesizing them"""
+        schedule = self.slice(0, segment).schedule(samples_per_sec,
+                clock=clock)
+        return Position(segment, sum(schedule.counts),
+                schedule.offset, schedule.carry)
+
+    def line_range(self, first, stop, step=1):
+        """returns the start and stop segment index of the sections of
+           image lines from first to stop - 1, each section carrying step
+           lines (so the range may start before first), raises KeyError
+           if none"""
+        lines = [section for section in self.sections
+                if section.kind == 'line'
+                and first < section.line + step and section.line < stop]
+        if not lines:
+            raise KeyError(('line', first, stop))
+        return lines[0].start, lines[-1].stop
+
+    def find(self, kind, line=None):
+        """returns the first section with the given kind and line number"""
+        for section in self.sections:
+            if section.kind == kind and section.line == line:
+                return section
+        raise KeyError((kind, line))
+
+    def tobytes(self):
+        """returns the plan as native 4-byte single precision floats,
+           8 bytes per segment, as struct.pack('ff', freq, msec) would"""
+        pairs = array('f', bytes(8 * len(self)))
+        pairs[0::2] = array('f', self.freqs)
+        pairs[1::2] = array('f', self.msecs)
+        return pairs.tobytes()
+
+    def __len__(self):
+        return len(self.freqs)
+
+    def __iter__(self):
+        return zip(self.freqs, self.msecs)
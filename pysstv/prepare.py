@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+Prepares images for encoding, turning an image of any size into one of
+exactly the size of a mode, in the color space its planes are extracted
+from (the IMAGE_MODE attribute of the mode class), so the mode only has to
+split it into planes.
+
+Each step is done in as few passes over the pixels as possible: images
+that haven't been loaded yet (like the ones returned by Image.open) are
+decoded near the size needed using Image.draft, which makes JPEG decoders
+scale down by up to a factor of 8 while decoding, and directly into the
+L or YCbCr color space, skipping a separate conversion. Cropping is done
+by resizing only the part of the image that's kept (the box parameter of
+Image.resize), and the resampling filter is applied after an integer
+reduce() of the image (reducing_gap), both in a single resize call. The
+color space is converted after resizing, so only the pixels of the mode
+are converted, and padding pastes into a background created in the color
+space of the mode.
+"""
+
+from __future__ import division
+from math import ceil
+
+FITS = ('stretch', 'crop', 'pad')
+REDUCING_GAP = 2.0
+RESIZE_MODES = ('L', 'RGB', 'RGBA', 'YCbCr')
+
+
+def open_image(filename, mode, fit=None, resample='lanczos'):
+    """opens an image file and prepares it for an SSTV mode class,
+       see prepare_image()"""
+    from PIL import Image
+    return prepare_image(Image.open(filename), mode, fit, resample)
+
+
+def prepare_image(image, mode, fit=None, resample='lanczos'):
+    """returns an image of exactly the size and in the color space of an
+       SSTV mode class, fit is None to use the top left corner of images
+       at least as large as the mode (raising ValueError for smaller
+       ones), 'stretch' to resize, 'crop' to resize keeping the aspect
+       ratio and cutting off the excess, or 'pad' to resize keeping the
+       aspect ratio and filling the rest with black, resample is the name
+       of a Pillow resampling filter"""
+    from PIL import Image
+    target = mode.WIDTH, mode.HEIGHT
+    if fit is not None and fit not in FITS:
+        raise ValueError('Unknown fit {0!r}, must be one of {1}'.format(
+            fit, ', '.join(FITS)))
+    if fit is None or image.size == target:
+        if not all(i >= m for i, m in zip(image.size, target)):
+            raise ValueError(('Image must be at least {m.WIDTH} x {m.HEIGHT} '
+                'pixels for mode {m.__name__}').format(m=mode))
+        image.draft(mode.IMAGE_MODE, None)
+        if image.size != target:
+            image = image.crop((0, 0) + target)
+        return convert(image, mode.IMAGE_MODE)
+    scaled, box, _ = layout(image.size, target, fit)
+    scale_x = scaled[0] / (box[2] - box[0])
+    scale_y = scaled[1] / (box[3] - box[1])
+    image.draft(mode.IMAGE_MODE, (
+        int(ceil(image.size[0] * scale_x * REDUCING_GAP)),
+        int(ceil(image.size[1] * scale_y * REDUCING_GAP))))
+    scaled, box, offset = layout(image.size, target, fit)
+    if image.mode not in RESIZE_MODES:
+        image = image.convert('RGB')
+    image = convert(image.resize(scaled, getattr(Image, resample.upper()),
+        box, REDUCING_GAP), mode.IMAGE_MODE)
+    if scaled == target:
+        return image
+    background = Image.new(mode.IMAGE_MODE, target,
+            Image.new('RGB', (1, 1)).convert(mode.IMAGE_MODE).getpixel((0, 0)))
+    background.paste(image, offset)
+    return background
+
+
+def layout(size, target, fit):
+    """returns the size an image of the given size has to be resized to,
+       the box of the image to resize, and the offset of the result within
+       an image of the target size"""
+    width, height = size
+    box = (0, 0, width, height)
+    ratio = width / height
+    target_ratio = target[0] / target[1]
+    if fit == 'stretch' or ratio == target_ratio:
+        return target, box, (0, 0)
+    if fit == 'crop':
+        if ratio < target_ratio:
+            kept = width / target_ratio
+            top = (height - kept) / 2
+            return target, (0, top, width, top + kept), (0, 0)
+        kept = height * target_ratio
+        left = (width - kept) / 2
+        return target, (left, 0, left + kept, height), (0, 0)
+    if ratio > target_ratio:
+        scaled = target[0], int(target[0] / ratio)
+    else:
+        scaled = int(ratio * target[1]), target[1]
+    return scaled, box, ((target[0] - scaled[0]) // 2,
+            (target[1] - scaled[1]) // 2)
+
+
+def convert(image, mode):
+    return image if image.mode == mode else image.convert(mode)
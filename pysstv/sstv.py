@@ -2,10 +2,17 @@
 
 from __future__ import division, with_statement
 from math import sin, pi
-from random import random
+from random import random, Random
 from contextlib import closing
-from itertools import cycle, chain
+from itertools import cycle, chain, islice, takewhile
 from array import array
+from collections import namedtuple, OrderedDict
+from threading import Lock
+from sys import byteorder
+from pysstv import vectorized
+from pysstv.plan import Plan
+import mmap
+import struct
 import wave
 
 FREQ_VIS_BIT1 = 1100
@@ -23,15 +30,27 @@ MSEC_VIS_SYNC = 10
 MSEC_VIS_BIT = 30
 MSEC_FSKID_BIT = 22
 
+ENGINES = ('python', 'numpy', 'native')
+BLOCK_SIZE = 16384
+
 
 class SSTV(object):
+    ENGINE = 'python'
 
-    def __init__(self, image, samples_per_sec, bits):
+    def __init__(self, image, samples_per_sec, bits, engine=None):
         self.image = image
         self.samples_per_sec = samples_per_sec
         self.bits = bits
+        self.engine = self.ENGINE if engine is None else engine
+        if self.engine not in ENGINES:
+            raise ValueError('Unknown engine {0!r}'.format(self.engine))
         self.vox_enabled = False
         self.fskid_payload = ''
+        self.dither_seed = None
+        self.workers = 1
+        self.preamble_cache = PREAMBLE_CACHE
+        self.oscillator = None
+        self.sample_clock = None
         self.nchannels = 1
         self.on_init()
 
@@ -40,18 +59,115 @@ class SSTV(object):
 
     BITS_TO_STRUCT = {8: 'b', 16: 'h'}
 
-    def write_wav(self, filename):
+    def sample_typecode(self):
+        """returns the array typecode of the samples written to files and
+           buffers, raises ValueError if bits isn't one of BITS_TO_STRUCT"""
+        try:
+            return self.BITS_TO_STRUCT[self.bits]
+        except KeyError:
+            raise ValueError('Unsupported bits per sample {0}, must be '
+                    'one of {1}'.format(self.bits, ', '.join(
+                        map(str, sorted(self.BITS_TO_STRUCT)))))
+
+    def write_wav(self, filename, chunk_frames=BLOCK_SIZE):
         """writes the whole image to a Microsoft WAV file"""
-        fmt = self.BITS_TO_STRUCT[self.bits]
-        data = array(fmt, self.gen_samples())
-        if self.nchannels != 1:
-            data = array(fmt, chain.from_iterable(
-                zip(*([data] * self.nchannels))))
-        with closing(wave.open(filename, 'wb')) as wav:
+        with open(filename, 'wb') as f:
+            self.write_wav_file(f, chunk_frames)
+
+    def write_wav_file(self, fileobj, chunk_frames=BLOCK_SIZE):
+        """writes the whole image in Microsoft WAV format to a seekable
+           file object, generating and writing at most chunk_frames
+           frames at a time, so memory usage doesn't depend on the mode,
+           non-seekable file objects (such as pipes) get the length of the
+           transmission in the header up front from sample_count()"""
+        self.sample_typecode()
+        with closing(wave.open(fileobj, 'wb')) as wav:
             wav.setnchannels(self.nchannels)
             wav.setsampwidth(self.bits // 8)
             wav.setframerate(self.samples_per_sec)
-            wav.writeframes(data)
+            if not getattr(fileobj, 'seekable', lambda: False)():
+                # the header can't be patched at the end, so it has to
+                # have the right length before writing the first frame
+                wav.setnframes(self.sample_count())
+            for block in self.gen_sample_blocks(chunk_frames):
+                wav.writeframesraw(interleave(block, self.nchannels))
+
+    def write_wav_mmap(self, filename, chunk_frames=BLOCK_SIZE):
+        """writes the whole image to a Microsoft WAV file preallocated
+           using sample_count(), writing the header once and rendering
+           the samples directly into a memory map of the file, if workers
+           is greater than one, each worker process writes its own span"""
+        typecode = self.sample_typecode()
+        sampwidth = self.bits // 8
+        nframes = self.sample_count()
+        header = wav_header(self.nchannels, sampwidth,
+                self.samples_per_sec, nframes)
+        size = nframes * self.nchannels * sampwidth
+        with open(filename, 'w+b') as f:
+            f.write(header)
+            f.truncate(len(header) + size)
+        if not size:
+            return
+        if self.workers > 1:
+            from pysstv import parallel
+            parallel.write_spans(self, self.workers, filename, len(header),
+                    chunk_frames)
+            return
+        with open(filename, 'r+b') as f, mmap.mmap(f.fileno(), 0) as m:
+            self.render_into(m, len(header), chunk_frames)
+            if byteorder == 'big' and sampwidth > 1:
+                data = array(typecode, m[len(header):])
+                data.byteswap()
+                m[len(header):] = data.tobytes()
+
+    def write_raw_file(self, fileobj, chunk_frames=BLOCK_SIZE):
+        """writes the whole image as headerless little endian signed
+           integers of the bits per sample value given during construction
+           to a binary file object (which may be a pipe), interleaved for
+           nchannels channels, at most chunk_frames frames at a time"""
+        self.sample_typecode()
+        for block in self.gen_sample_blocks(chunk_frames):
+            fileobj.write(little_endian(interleave(block, self.nchannels)))
+
+    def write_float_file(self, fileobj, chunk_frames=BLOCK_SIZE):
+        """writes the whole image as headerless little endian 32-bit
+           floats between -1 and +1 to a binary file object (which may be
+           a pipe), interleaved for nchannels channels, at most
+           chunk_frames frames at a time"""
+        for block in self.gen_value_blocks(chunk_frames):
+            fileobj.write(little_endian(interleave(
+                to_float32(block), self.nchannels)))
+
+    def render(self, chunk_frames=BLOCK_SIZE):
+        """returns the whole output of gen_samples(), interleaved for
+           nchannels channels, as a memoryview of integers backed by a
+           bytearray allocated up front using sample_count()"""
+        typecode = self.sample_typecode()
+        buffer = bytearray(self.sample_count() * self.nchannels *
+                (self.bits // 8))
+        self.render_into(buffer, 0, chunk_frames)
+        return memoryview(buffer).cast(typecode)
+
+    def render_into(self, buffer, offset=0, chunk_frames=BLOCK_SIZE,
+            plan=None):
+        """renders the output of gen_samples() into a writable buffer
+           (such as a bytearray, an mmap, a NumPy array or the buf of a
+           multiprocessing.shared_memory.SharedMemory) starting at the
+           given byte offset, in native byte order, interleaved for
+           nchannels channels, raises ValueError if it's too small,
+           returns the number of bytes written"""
+        self.sample_typecode()
+        size = self.sample_count() * self.nchannels * (self.bits // 8)
+        with memoryview(buffer) as raw, raw.cast('B') as view:
+            if len(view) - offset < size:
+                raise ValueError('Buffer too small, {0} bytes needed '
+                        'after offset {1}'.format(size, offset))
+            position = offset
+            for block in self.gen_sample_blocks(chunk_frames, plan):
+                data = memoryview(interleave(block, self.nchannels)).cast('B')
+                view[position:position + len(data)] = data
+                position += len(data)
+        return position - offset
 
     def gen_samples(self):
         """generates discrete samples from gen_values()
@@ -59,16 +175,80 @@ class SSTV(object):
            performs quantization according to
            the bits per sample value given during construction
         """
-        max_value = 2 ** self.bits
-        alias = 1 / max_value
-        amp = max_value // 2
-        lowest = -amp
-        highest = amp - 1
-        alias_cycle = cycle((alias * (random() - 0.5) for _ in range(1024)))
-        for value, alias_item in zip(self.gen_values(), alias_cycle):
-            sample = int(value * amp + alias_item)
-            yield (lowest if sample <= lowest else
-                sample if sample <= highest else highest)
+        for block in self.gen_sample_blocks():
+            yield from (block.tolist() if self.use_numpy() else block)
+
+    def gen_sample_blocks(self, block_size=BLOCK_SIZE, plan=None):
+        """generates the output of gen_samples() in blocks
+
+           blocks are NumPy integer arrays if the numpy engine is in use
+           and array('b') or array('h') objects otherwise, the dither
+           noise can be made reproducible by setting dither_seed,
+           see gen_value_blocks() for the plan parameter, if workers is
+           greater than one, the samples are rendered by that many processes,
+           unless the native engine is in use, which ignores both
+        """
+        if self.engine == 'native':
+            from pysstv import native
+            kernel = native.get_kernel(self)
+            if kernel is not None:
+                return native.gen_sample_blocks(self, kernel, block_size)
+        if self.workers > 1:
+            from pysstv import parallel
+            return parallel.gen_sample_blocks(
+                    self, self.workers, block_size, plan)
+        quantizer = Quantizer(self.bits, self.dither_seed)
+        if (self.preamble_cache is None or
+                type(self).gen_freq_bits is not SSTV.gen_freq_bits):
+            return map(quantizer.quantize,
+                    self.gen_value_blocks(block_size, plan))
+        return self.gen_cached_sample_blocks(quantizer, block_size, plan)
+
+    def stream(self, chunk_frames=BLOCK_SIZE, buffer_chunks=8):
+        """returns a stream.Streamer rendering the output of
+           write_raw_file() ahead on a worker thread, which can be consumed
+           by async for, or by calling its read() from an audio callback"""
+        self.sample_typecode()
+        from pysstv.stream import Streamer
+        return Streamer(self, chunk_frames, buffer_chunks)
+
+    def gen_cached_sample_blocks(self, quantizer, block_size, plan):
+        """generates the output of gen_sample_blocks() taking
+           the samples of the VOX tones and the VIS header from
+           the preamble cache and resuming synthesis after them"""
+        preamble = self.get_preamble(quantizer)
+        samples = preamble.samples
+        for lo in range(0, len(samples), block_size):
+            yield samples[lo:lo + block_size]
+        quantizer.position = len(samples) % quantizer.DITHER_LENGTH
+        if plan is None:
+            sections = islice(self.gen_sections(),
+                    1 + self.vox_enabled, None)
+            plans = Plan.gen_partial(sections, vectorized.SEGMENT_BATCH)
+        else:
+            plans = [plan.slice(preamble.segments)]
+        yield from map(quantizer.quantize, self.render_value_blocks(
+            plans, block_size, preamble.offset, preamble.carry))
+
+    def get_preamble(self, quantizer):
+        """returns the Preamble of this transmission from preamble_cache,
+           rendering it with the given quantizer if it's not cached yet"""
+        key = (type(self), self.VIS_CODE, self.samples_per_sec, self.bits,
+                self.vox_enabled, self.dither_seed, self.use_numpy(),
+                self.oscillator, self.sample_clock)
+        preamble = self.preamble_cache.get(key)
+        if preamble is None:
+            plan = Plan.from_sections(islice(self.gen_sections(),
+                1 + self.vox_enabled))
+            schedule = plan.schedule(self.samples_per_sec,
+                    clock=self.sample_clock)
+            samples = join_blocks([quantizer.quantize(block) for block
+                in self.render_value_blocks([plan], BLOCK_SIZE)],
+                quantizer.typecode)
+            preamble = Preamble(samples, len(plan),
+                    schedule.offset, schedule.carry)
+            self.preamble_cache.put(key, preamble)
+        return preamble
 
     def gen_values(self):
         """generates samples between -1 and +1 from gen_freq_bits()
@@ -76,19 +256,131 @@ class SSTV(object):
            performs sampling according to
            the samples per second value given during construction
         """
-        spms = self.samples_per_sec / 1000
-        offset = 0
-        samples = 0
-        factor = 2 * pi / self.samples_per_sec
-        sample = 0
-        for freq, msec in self.gen_freq_bits():
-            samples += spms * msec
-            tx = int(samples)
-            freq_factor = freq * factor
-            for sample in range(tx):
-                yield sin(sample * freq_factor + offset)
-            offset += (sample + 1) * freq_factor
-            samples -= tx
+        if self.use_numpy():
+            for block in self.gen_value_blocks():
+                yield from block.tolist()
+        else:
+            yield from gen_values(self.gen_freq_bits(), self.samples_per_sec,
+                    oscillator=self.oscillator, clock=self.sample_clock)
+
+    def gen_value_blocks(self, block_size=BLOCK_SIZE, plan=None):
+        """generates the output of gen_values() in blocks
+
+           blocks are NumPy arrays if the numpy engine is in use
+           and array('d') objects otherwise, if plan is given, it's
+           used instead of gen_freq_bits(), it must be a Plan of this
+           transmission, for example one built earlier and cached
+        """
+        if plan is None:
+            plans = Plan.gen_partial(self.gen_sections(),
+                    vectorized.SEGMENT_BATCH)
+        else:
+            plans = [plan]
+        return self.render_value_blocks(plans, block_size)
+
+    def render_value_blocks(self, plans, block_size, offset=0, carry=0):
+        """generates blocks of samples between -1 and +1 from consecutive
+           plans, starting from the given phase and fractional carry"""
+        if self.use_numpy():
+            return vectorized.gen_value_blocks(plans, self.samples_per_sec,
+                    block_size, offset, carry, self.oscillator,
+                    self.sample_clock)
+        freq_bits = chain.from_iterable(plans)
+        return gen_blocks(gen_values(freq_bits, self.samples_per_sec,
+            offset, carry, self.oscillator, self.sample_clock), 'd',
+            block_size)
+
+    def gen_line_value_blocks(self, first, stop, block_size=BLOCK_SIZE,
+            plan=None):
+        """generates the part of the output of gen_value_blocks() that
+           belongs to image lines from first to stop - 1, starting with
+           the phase and fractional sample carry computed from the plan
+           without synthesizing anything before the first line"""
+        position, lines = self.locate_lines(first, stop, plan)
+        return self.render_value_blocks([lines], block_size,
+                position.offset, position.carry)
+
+    def gen_line_sample_blocks(self, first, stop, block_size=BLOCK_SIZE,
+            plan=None):
+        """generates the part of the output of gen_sample_blocks() that
+           belongs to image lines from first to stop - 1, which is exactly
+           the same as the corresponding part of the whole transmission
+           if dither_seed is set"""
+        position, lines = self.locate_lines(first, stop, plan)
+        quantizer = Quantizer(self.bits, self.dither_seed)
+        quantizer.position = position.sample % quantizer.DITHER_LENGTH
+        return map(quantizer.quantize, self.render_value_blocks(
+            [lines], block_size, position.offset, position.carry))
+
+    def locate_lines(self, first, stop, plan=None):
+        """returns the Position of the first sample of image lines from
+           first to stop - 1 and the Plan of those lines, widened to whole
+           sections for modes transmitting several lines per section (like
+           the pairs of the PD modes), if plan is not given, the sections
+           after the last line aren't generated, modes that don't generate
+           per line sections raise KeyError"""
+        if plan is None:
+            plan = Plan.from_sections(takewhile(lambda section:
+                section[0] != 'line' or section[1] < stop,
+                self.gen_sections()))
+        lo, hi = plan.line_range(first, stop, getattr(self, 'LINE_STEP', 1))
+        return (plan.position(lo, self.samples_per_sec, self.sample_clock),
+                plan.slice(lo, hi))
+
+    def sample_count(self):
+        """returns the number of samples gen_values() generates, computed
+           from the segment durations the same way, without encoding the
+           image or synthesizing anything, cached per mode, sample rate,
+           VOX setting, FSKID length and sample clock unless gen_freq_bits
+           is overridden or the instance overrides class constants
+
+           the first call still goes through every segment in Python,
+           which takes a noticeable time for large modes (about 0.35 s
+           for PD290 at 48 kHz), only cached calls take microseconds"""
+        if type(self).gen_freq_bits is not SSTV.gen_freq_bits:
+            return count_samples((msec for _, msec in self.gen_freq_bits()),
+                    self.samples_per_sec, self.sample_clock)
+        if self.overrides_constants():
+            return count_samples(self.gen_msecs(), self.samples_per_sec,
+                    self.sample_clock)
+        key = (type(self), self.samples_per_sec, self.vox_enabled,
+                len(self.fskid_payload), self.sample_clock)
+        count = SAMPLE_COUNTS.get(key)
+        if count is None:
+            count = count_samples(self.gen_msecs(), self.samples_per_sec,
+                    self.sample_clock)
+            SAMPLE_COUNTS[key] = count
+        return count
+
+    def overrides_constants(self):
+        """returns True if the instance shadows class constants (upper case
+           attributes such as SYNC or SCAN), so the timing of the mode can't
+           be taken from caches keyed by its class"""
+        return any(name.isupper() for name in vars(self))
+
+    def duration(self):
+        """returns the length of the transmission in seconds"""
+        return self.sample_count() / self.samples_per_sec
+
+    def gen_msecs(self):
+        """generates the durations of the segments of gen_freq_bits()"""
+        if self.vox_enabled:
+            for _, msec in self.gen_vox_tuples():
+                yield msec
+        for _, msec in self.gen_vis_tuples():
+            yield msec
+        yield from self.gen_image_msecs()
+        for _, msec in self.gen_fskid_tuples():
+            yield msec
+
+    def gen_image_msecs(self):
+        """generates the durations of the segments of gen_image_tuples(),
+           subclasses may override it to do so without encoding the image"""
+        for _, msec in self.gen_image_tuples():
+            yield msec
+
+    def use_numpy(self):
+        return self.engine == 'numpy' and vectorized.numpy is not None
 
     def gen_freq_bits(self):
         """generates tuples (freq, msec) that describe a sine wave segment
@@ -96,8 +388,35 @@ class SSTV(object):
            frequency "freq" in Hz and duration "msec" in ms
         """
         if self.vox_enabled:
-            for freq in (1900, 1500, 1900, 1500, 2300, 1500, 2300, 1500):
-                yield freq, 100
+            yield from self.gen_vox_tuples()
+        yield from self.gen_vis_tuples()
+        yield from self.gen_image_tuples()
+        yield from self.gen_fskid_tuples()
+
+    def gen_sections(self):
+        """generates (kind, line, tuples) triplets that split the output
+           of gen_freq_bits() into parts of the transmission
+
+           kind is 'vox', 'vis', 'image', 'line' (a single image line with
+           its number in line, which is None for other kinds) or 'fskid',
+           if gen_freq_bits() is overridden, its output is a single section
+           of kind 'other'
+        """
+        if type(self).gen_freq_bits is not SSTV.gen_freq_bits:
+            yield 'other', None, self.gen_freq_bits()
+            return
+        if self.vox_enabled:
+            yield 'vox', None, self.gen_vox_tuples()
+        yield 'vis', None, self.gen_vis_tuples()
+        yield from self.gen_image_sections()
+        if self.fskid_payload:
+            yield 'fskid', None, self.gen_fskid_tuples()
+
+    def gen_vox_tuples(self):
+        for freq in (1900, 1500, 1900, 1500, 2300, 1500, 2300, 1500):
+            yield freq, 100
+
+    def gen_vis_tuples(self):
         yield FREQ_VIS_START, MSEC_VIS_START
         yield FREQ_SYNC, MSEC_VIS_SYNC
         yield FREQ_VIS_START, MSEC_VIS_START
@@ -113,7 +432,8 @@ class SSTV(object):
         parity_freq = FREQ_VIS_BIT1 if num_ones % 2 == 1 else FREQ_VIS_BIT0
         yield parity_freq, MSEC_VIS_BIT
         yield FREQ_SYNC, MSEC_VIS_BIT  # stop bit
-        yield from self.gen_image_tuples()
+
+    def gen_fskid_tuples(self):
         for fskid_byte in map(ord, self.fskid_payload):
             for _ in range(6):
                 bit = fskid_byte & 1
@@ -124,6 +444,9 @@ class SSTV(object):
     def gen_image_tuples(self):
         return []
 
+    def gen_image_sections(self):
+        yield 'image', None, self.gen_image_tuples()
+
     def add_fskid_text(self, text):
         self.fskid_payload += '\x20\x2a{0}\x01'.format(
                 ''.join(chr(ord(c) - 0x20) for c in text))
@@ -132,5 +455,211 @@ class SSTV(object):
         yield FREQ_SYNC, self.SYNC
 
 
+class Quantizer(object):
+    """quantizes blocks of values between -1 and +1 to signed integers
+
+       a cycle of 1024 noise values is added to the scaled values, its
+       position is kept between blocks, so splitting the input into
+       blocks doesn't change the output
+    """
+
+    DITHER_LENGTH = 1024
+
+    def __init__(self, bits, seed=None):
+        max_value = 2 ** bits
+        alias = 1 / max_value
+        self.amp = max_value // 2
+        self.lowest = -self.amp
+        self.highest = self.amp - 1
+        # wider samples only go through gen_samples(), the writers
+        # reject them using SSTV.sample_typecode()
+        self.typecode = SSTV.BITS_TO_STRUCT.get(bits, 'q')
+        rnd = random if seed is None else Random(seed).random
+        self.dither = [alias * (rnd() - 0.5)
+                for _ in range(self.DITHER_LENGTH)]
+        self.position = 0
+
+    def quantize(self, values):
+        """returns a NumPy array for NumPy input and an array otherwise"""
+        position = self.position
+        self.position = (position + len(values)) % self.DITHER_LENGTH
+        if vectorized.numpy is not None and isinstance(
+                values, vectorized.numpy.ndarray):
+            return vectorized.quantize(values, self.amp, self.lowest,
+                    self.highest, self.dither, position, self.typecode)
+        amp = self.amp
+        lowest = self.lowest
+        highest = self.highest
+        dither = cycle(self.dither[position:] + self.dither[:position])
+        return array(self.typecode, [
+            lowest if sample <= lowest else
+            sample if sample <= highest else highest
+            for sample in (int(value * amp + alias_item)
+                for value, alias_item in zip(values, dither))])
+
+
+def gen_values(freq_bits, samples_per_sec, offset=0, samples=0,
+        oscillator=None, clock=None):
+    """generates samples between -1 and +1 from (freq, msec) tuples,
+       offset and samples are the phase and fractional sample carry
+       at the start, oscillator replaces sin() if it's not None,
+       clock is an optional clock.ExactClock"""
+    spms = samples_per_sec / 1000
+    factor = 2 * pi / samples_per_sec
+    counter = None if clock is None else clock.counter(samples_per_sec,
+            samples)
+    for freq, msec in freq_bits:
+        if counter is None:
+            samples += spms * msec
+            tx = int(samples)
+            samples -= tx
+        else:
+            tx = counter.advance(msec)
+        freq_factor = freq * factor
+        if oscillator is None:
+            for sample in range(tx):
+                yield sin(sample * freq_factor + offset)
+        else:
+            yield from oscillator.gen_values(freq_factor, tx, offset)
+        offset += tx * freq_factor
+
+
+# quantized samples of the VOX tones and the VIS header, the number of
+# segments they're made of, and the phase and fractional sample carry
+# after them, needed to resume synthesis with the image
+Preamble = namedtuple('Preamble', 'samples segments offset carry')
+
+
+class PreambleCache(object):
+    """thread-safe LRU cache of Preamble objects with at most maxsize
+       entries, keyed by everything that affects the preamble samples"""
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            preamble = self.entries.get(key)
+            if preamble is not None:
+                self.entries.move_to_end(key)
+            return preamble
+
+    def put(self, key, preamble):
+        if vectorized.numpy is not None and isinstance(
+                preamble.samples, vectorized.numpy.ndarray):
+            preamble.samples.flags.writeable = False
+        with self.lock:
+            self.entries[key] = preamble
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+PREAMBLE_CACHE = PreambleCache()
+
+# number of samples per (mode, sample rate, VOX setting, FSKID length,
+# sample clock)
+SAMPLE_COUNTS = {}
+
+
+def count_samples(msecs, samples_per_sec, clock=None):
+    """returns the number of samples of segments with the given durations
+       with the fractional sample carry of gen_values()"""
+    if clock is not None:
+        counts, _ = clock.counts(array('d', msecs), samples_per_sec)
+        return sum(counts)
+    spms = samples_per_sec / 1000
+    total = 0
+    carry = 0
+    for msec in msecs:
+        carry += spms * msec
+        tx = int(carry)
+        total += tx
+        carry -= tx
+    return total
+
+
+def join_blocks(blocks, typecode):
+    """concatenates blocks of samples returned by Quantizer.quantize"""
+    if blocks and vectorized.numpy is not None and isinstance(
+            blocks[0], vectorized.numpy.ndarray):
+        return vectorized.numpy.concatenate(blocks)
+    joined = array(typecode)
+    for block in blocks:
+        joined.extend(block)
+    return joined
+
+
+def gen_schedule_values(freq_factors, counts, phases, oscillator=None):
+    """generates samples between -1 and +1 from the segments of a Schedule
+       the same way as gen_values()"""
+    for freq_factor, tx, offset in zip(freq_factors, counts, phases):
+        if oscillator is None:
+            for sample in range(tx):
+                yield sin(sample * freq_factor + offset)
+        else:
+            yield from oscillator.gen_values(freq_factor, tx, offset)
+
+
+def interleave(block, nchannels):
+    """repeats each sample of a block for every channel"""
+    if nchannels == 1:
+        return block
+    if vectorized.numpy is not None and isinstance(
+            block, vectorized.numpy.ndarray):
+        return vectorized.numpy.repeat(block, nchannels)
+    return array(block.typecode, chain.from_iterable(
+        zip(*([block] * nchannels))))
+
+
+def wav_header(nchannels, sampwidth, framerate, nframes):
+    """returns the 44 byte header of a PCM Microsoft WAV file, the same
+       as the one written by the wave module"""
+    size = nframes * nchannels * sampwidth
+    return struct.pack('<4sL4s4sLHHLLHH4sL', b'RIFF', 36 + size, b'WAVE',
+            b'fmt ', 16, 1, nchannels, framerate,
+            nchannels * framerate * sampwidth, nchannels * sampwidth,
+            sampwidth * 8, b'data', size)
+
+
+def to_float32(block):
+    """converts a block of values to single precision"""
+    if vectorized.numpy is not None and isinstance(
+            block, vectorized.numpy.ndarray):
+        return block.astype(vectorized.numpy.float32)
+    return array('f', block)
+
+
+def little_endian(block):
+    """returns a block of samples with little endian byte order,
+       which is the native one on most platforms"""
+    if byteorder == 'little':
+        return block
+    if vectorized.numpy is not None and isinstance(
+            block, vectorized.numpy.ndarray):
+        return block.byteswap()
+    swapped = array(block.typecode, block)
+    swapped.byteswap()
+    return swapped
+
+
+def gen_blocks(iterable, typecode, block_size):
+    iterator = iter(iterable)
+    while True:
+        block = array(typecode, islice(iterator, block_size))
+        if not block:
+            break
+        yield block
+
+
 def byte_to_freq(value):
     return FREQ_BLACK + FREQ_RANGE * value / 255
+
+
+BYTE_TO_FREQ = [byte_to_freq(value) for value in range(256)]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+"""
+Streams transmissions to live audio output.
+
+A Streamer renders samples ahead on a worker thread into a bounded ring
+buffer of little endian PCM bytes (the same format as SSTV.write_raw_file),
+blocking the worker while the buffer is full, so the amount rendered ahead
+is bounded. Consumers either iterate over it asynchronously, or call read()
+from an audio callback, which only copies bytes that are already prepared,
+and pads the chunk with silence (counting an underrun) if the worker fell
+behind. Rendering itself runs in the worker thread, or on the processes of
+SSTV.gen_sample_blocks if the workers attribute is greater than one.
+"""
+
+from __future__ import division
+from threading import Condition, Thread
+import asyncio
+from pysstv.sstv import BLOCK_SIZE, interleave, little_endian
+
+
+class RingBuffer(object):
+    """a bounded, thread-safe FIFO of bytes"""
+
+    def __init__(self, capacity):
+        self.data = bytearray(capacity)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+        self.finished = False
+        self.aborted = False
+        self.condition = Condition()
+
+    def write(self, data):
+        """appends the bytes of a buffer, blocking while the ring is full,
+           returns False if the ring was aborted in the meantime"""
+        view = memoryview(data).cast('B')
+        while len(view):
+            with self.condition:
+                while self.size == self.capacity and not self.aborted:
+                    self.condition.wait()
+                if self.aborted:
+                    return False
+                n = min(len(view), self.capacity - self.size)
+                end = (self.start + self.size) % self.capacity
+                first = min(n, self.capacity - end)
+                self.data[end:end + first] = view[:first]
+                self.data[:n - first] = view[first:n]
+                self.size += n
+                self.condition.notify_all()
+            view = view[n:]
+        return True
+
+    def read(self, n, block=False):
+        """removes and returns at most n bytes, if block is true, waits
+           until n bytes are available or the writer finished"""
+        with self.condition:
+            if block:
+                while self.size < n and not self.finished:
+                    self.condition.wait()
+            n = min(n, self.size)
+            first = min(n, self.capacity - self.start)
+            data = bytes(self.data[self.start:self.start + first]) + bytes(
+                    self.data[:n - first])
+            self.start = (self.start + n) % self.capacity
+            self.size -= n
+            self.condition.notify_all()
+            return data
+
+    def finish(self):
+        """signals that nothing will be written anymore"""
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def abort(self):
+        """makes pending and further writes return False"""
+        with self.condition:
+            self.aborted = True
+            self.condition.notify_all()
+
+
+class Streamer(object):
+    def __init__(self, sstv, chunk_frames=BLOCK_SIZE, buffer_chunks=8):
+        """starts rendering the transmission of an SSTV instance ahead
+           into a ring buffer of buffer_chunks chunks of chunk_frames"""
+        self.sstv = sstv
+        self.chunk_frames = chunk_frames
+        self.frame_size = sstv.bits // 8 * sstv.nchannels
+        self.buffer = RingBuffer(buffer_chunks * chunk_frames * self.frame_size)
+        self.underruns = 0
+        self.error = None
+        self.thread = Thread(target=self.produce)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def produce(self):
+        nchannels = self.sstv.nchannels
+        try:
+            for block in self.sstv.gen_sample_blocks(self.chunk_frames):
+                if not self.buffer.write(little_endian(
+                        interleave(block, nchannels))):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            self.buffer.finish()
+
+    @property
+    def finished(self):
+        """True if everything has been rendered and read"""
+        return self.buffer.finished and not self.buffer.size
+
+    @property
+    def lead_time(self):
+        """seconds of audio rendered ahead and not read yet"""
+        return (self.buffer.size / self.frame_size /
+                self.sstv.samples_per_sec)
+
+    def read(self, frames):
+        """returns the bytes of the next frames without blocking, suitable
+           for audio callbacks, padded with silence if rendering fell
+           behind, and shorter than requested only at the end"""
+        n = frames * self.frame_size
+        data = self.buffer.read(n)
+        if len(data) < n and not self.buffer.finished:
+            self.underruns += 1
+            data += bytes(n - len(data))
+        return data
+
+    def close(self):
+        """stops rendering and waits for the worker thread to exit"""
+        self.buffer.abort()
+        self.thread.join()
+
+    def __aiter__(self):
+        return self.gen_chunks()
+
+    async def gen_chunks(self):
+        """generates chunks of chunk_frames frames as bytes (the last one
+           may be shorter), waiting for the worker without blocking the
+           event loop, which counts as an underrun after the first chunk"""
+        loop = asyncio.get_running_loop()
+        n = self.chunk_frames * self.frame_size
+        started = False
+        try:
+            while True:
+                if self.buffer.size < n and not self.buffer.finished:
+                    self.underruns += started
+                    data = await loop.run_in_executor(
+                            None, self.buffer.read, n, True)
+                else:
+                    data = self.buffer.read(n)
+                if not data:
+                    break
+                started = True
+                yield data
+        finally:
+            self.close()
+        if self.error is not None:
+            raise self.error
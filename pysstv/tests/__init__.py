@@ -1,3 +1,3 @@
 #!/usr/bin/env python
 
-__all__ = ['common', 'test_color', 'test_sstv']
+__all__ = ['common', 'test_batch', 'test_benchmark', 'test_clock', 'test_color', 'test_decoder', 'test_incremental', 'test_main', 'test_modes', 'test_native', 'test_oscillator', 'test_parallel', 'test_plan', 'test_prepare', 'test_stream', 'test_sstv']
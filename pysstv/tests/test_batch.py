@@ -0,0 +1,109 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+import wave
+
+from PIL import Image
+
+from pysstv import batch
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.image = path.join(self.dir, 'gradient.png')
+        Image.linear_gradient('L').resize((160, 120)).save(self.image)
+        self.defaults = batch.Namespace(mode='MartinM1', rate=48000,
+                bits=16, vox=False, fskid=None, chan=None, format='wav',
+                resize=False, keep_aspect_ratio=False, keep_aspect=False,
+                resample='lanczos', output_dir=self.dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, filename, content):
+        filename = path.join(self.dir, filename)
+        with open(filename, 'w') as f:
+            f.write(content)
+        return filename
+
+    def test_read_manifest_csv(self):
+        manifest = self.write('jobs.csv', 'image,mode,rate,vox,fskid\n'
+                'a.png,Robot8BW,8000,yes,\nb.png,,,,HA5VSA\n')
+        jobs = [batch.make_job(item, self.defaults)
+                for item in batch.read_manifest(manifest)]
+        self.assertEqual(jobs[0].mode, 'Robot8BW')
+        self.assertEqual(jobs[0].rate, 8000)
+        self.assertTrue(jobs[0].vox)
+        self.assertEqual(jobs[0].fskid, None)
+        self.assertEqual(jobs[0].wav_file, path.join(self.dir, 'a.wav'))
+        self.assertEqual(jobs[1].mode, 'MartinM1')
+        self.assertEqual(jobs[1].rate, 48000)
+        self.assertFalse(jobs[1].vox)
+        self.assertEqual(jobs[1].fskid, 'HA5VSA')
+
+    def test_read_manifest_json(self):
+        manifest = self.write('jobs.jsonl', '{"image": "a.png", '
+                '"output": "out.wav", "bits": 8, "keep-aspect": true}\n\n')
+        job, = [batch.make_job(item, self.defaults)
+                for item in batch.read_manifest(manifest)]
+        self.assertEqual(job.wav_file, 'out.wav')
+        self.assertEqual(job.bits, 8)
+        self.assertTrue(job.keep_aspect)
+
+    def test_run_jobs(self):
+        items = [{'image': self.image, 'mode': 'Robot8BW', 'rate': 8000},
+                {'image': self.image, 'mode': 'MartinM1', 'output':
+                    path.join(self.dir, 'martin.wav')},
+                {'image': self.image, 'mode': 'Foo', 'output':
+                    path.join(self.dir, 'foo.wav')}]
+        results = list(batch.run_jobs(items, self.defaults, 1))
+        errors = {job.mode: error for job, _, error in results}
+        self.assertEqual(errors['Robot8BW'], None)
+        self.assertIn('at least 320 x 256', errors['MartinM1'])
+        self.assertIn('Unknown mode', errors['Foo'])
+        with wave.open(path.join(self.dir, 'gradient.wav')) as wav:
+            self.assertEqual(wav.getframerate(), 8000)
+
+    def test_invalid_jobs(self):
+        other = path.join(self.dir, 'other')
+        Image.linear_gradient('L').resize((160, 120)).save(
+                path.join(self.dir, 'other.png'))
+        items = [{'image': self.image, 'mode': 'Robot8BW', 'rate': 8000},
+                {'mode': 'Robot36'},
+                {'image': self.image, 'rate': 'fast'},
+                {'image': other + '.png', 'mode': 'Robot8BW', 'rate': 8000,
+                    'output': path.join(self.dir, 'gradient.wav')},
+                {'image': other + '.png', 'mode': 'Robot8BW', 'rate': 8000}]
+        results = list(batch.run_jobs(items, self.defaults, 1))
+        self.assertEqual(len(items), len(results))
+        errors = {job.img_file: error for job, _, error in results[:3]}
+        self.assertEqual('ValueError: Missing image', errors['(job 2)'])
+        self.assertIn('invalid literal', errors[self.image])
+        self.assertIn('written by an earlier job', errors[other + '.png'])
+        self.assertEqual([None, None], [error for _, _, error in results[3:]])
+        for name in ('gradient.wav', 'other.wav'):
+            with wave.open(path.join(self.dir, name)) as wav:
+                self.assertEqual(wav.getframerate(), 8000)
+
+    def test_invalid_manifest_rows(self):
+        csv_manifest = self.write('jobs.csv', 'image,mode,format,resample\n'
+                '{0},Robot8BW,mp3,\n{0},Robot8BW,,cubic\n'
+                '{0},Robot8BW,raw-s16le,\n'.format(self.image))
+        json_manifest = self.write('jobs.jsonl', '["a.png"]\n{"image": \n'
+                '{"image": "a.png", "mode": "Foo"}\n')
+        items = (batch.read_manifest(csv_manifest) +
+                batch.read_manifest(json_manifest))
+        self.defaults.rate = 8000
+        results = list(batch.run_jobs(items, self.defaults, 1))
+        self.assertEqual(len(items), len(results))
+        errors = [error for _, _, error in results]
+        self.assertIn("Unknown format 'mp3'", errors[0])
+        self.assertIn("Unknown resample filter 'cubic'", errors[1])
+        self.assertIn('is not an object', errors[2])
+        self.assertIn('Line 2:', errors[3])
+        self.assertIn("Unknown mode 'Foo'", errors[4])
+        self.assertEqual(None, errors[5])
+        self.assertTrue(path.exists(path.join(self.dir, 'gradient.s16')))
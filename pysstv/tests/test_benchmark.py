@@ -0,0 +1,31 @@
+import unittest
+
+from pysstv import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.results = benchmark.run_benchmarks(['Robot8BW'], [8000], [8],
+                [1, 2], ['python'], isolate=False)
+
+    def test_run_benchmarks(self):
+        records = self.results['results']
+        self.assertEqual([(r['stage'], r['channels']) for r in records],
+                [('gen_freq_bits', None), ('gen_values', None),
+                    ('gen_samples', None), ('write_wav', 1), ('write_wav', 2)])
+        samples = records[0]['samples']
+        self.assertEqual(samples, 71600)
+        for record in records:
+            self.assertEqual(record['samples'], samples)
+            self.assertAlmostEqual(record['realtime'],
+                    samples / 8000 / record['seconds'])
+        self.assertGreater(records[0]['segments'], 0)
+
+    def test_compare_results(self):
+        current = {'results': [dict(r) for r in self.results['results']]}
+        current['results'][2]['seconds'] *= 2
+        current['results'][3]['seconds'] *= 1.05
+        regressions = benchmark.compare_results(self.results, current, 0.1)
+        self.assertEqual([new['stage'] for _, new in regressions],
+                ['gen_samples'])
@@ -0,0 +1,58 @@
+from fractions import Fraction
+from array import array
+import unittest
+
+from PIL import Image
+
+from pysstv import vectorized
+from pysstv.clock import ExactClock
+from pysstv.color import PasokonP7
+from pysstv.grayscale import Robot8BW
+from pysstv.sstv import count_samples, join_blocks
+
+
+class TestExactClock(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = ExactClock()
+
+    def test_step(self):
+        self.assertEqual(self.clock.step(1000 / 4800, 48000), 10)
+        self.assertEqual(self.clock.step(0.3, 11025), Fraction(33075, 10000))
+
+    def test_counter(self):
+        counter = self.clock.counter(11025, Fraction(1, 2))
+        counts = [counter.advance(msec) for msec in (0.3, 1000 / 3, 0.3)]
+        total = Fraction(1, 2) + (Fraction(3, 10) * 2 + Fraction(1000, 3)) * \
+                11025 / 1000
+        self.assertEqual(sum(counts), int(total))
+        self.assertEqual(counter.carry, total - int(total))
+
+    def test_counts(self):
+        msecs = [0.3, 1.5, 1000 / 3, 0.3, 10] * 50
+        counter = self.clock.counter(44100)
+        expected = [counter.advance(msec) for msec in msecs]
+        counts, carry = self.clock.counts(array('d', msecs), 44100)
+        self.assertEqual(expected, list(counts))
+        self.assertEqual(counter.carry, carry)
+
+    def test_drift(self):
+        s = PasokonP7(Image.new('RGB', (640, 496)), 48000, 16)
+        msecs = list(s.gen_msecs())
+        exact = sum(Fraction(m).limit_denominator(10 ** 6) for m in msecs)
+        self.assertEqual(count_samples(msecs, 48000, self.clock),
+                int(exact * 48))
+        s.sample_clock = self.clock
+        self.assertEqual(s.sample_count(), int(exact * 48))
+
+    def test_engines(self):
+        s = Robot8BW(Image.new('L', (160, 120), 128), 11025, 16)
+        s.vox_enabled = True
+        s.dither_seed = 1
+        s.sample_clock = self.clock
+        samples = list(join_blocks(list(s.gen_sample_blocks()), 'h'))
+        self.assertEqual(len(samples), s.sample_count())
+        if vectorized.numpy is not None:
+            s.engine = 'numpy'
+            self.assertEqual(samples,
+                    list(join_blocks(list(s.gen_sample_blocks()), 'h')))
@@ -1,9 +1,11 @@
 import unittest
 from itertools import islice
 
+import mock
 from PIL import Image
 
-from pysstv import color
+from pysstv import color, sstv, vectorized
+from pysstv.grayscale import Slot
 from pysstv.tests.common import get_asset_filename, load_pickled_asset
 
 
@@ -42,3 +44,80 @@ class TestMartinM1(unittest.TestCase):
             expected = load_pickled_asset("MartinM1_encode_line_lena{0}".format(line))
             actual = list(self.lena.encode_line(line))
             self.assertEqual(expected, actual)
+
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+    def test_gen_values_numpy_lena(self):
+        lena = Image.open(get_asset_filename('320x256.png'))
+        s = color.MartinM1(lena, 48000, 16, engine='numpy')
+        expected = list(islice(self.lena.gen_values(), 0, 200000))
+        actual = list(islice(s.gen_values(), 0, 200000))
+        for e, a in zip(expected, actual):
+            self.assertAlmostEqual(e, a, delta=0.000000001)
+
+    def test_line_template(self):
+        template = self.s.line_template(0)
+        self.assertIs(template, self.lena.line_template(1))
+        self.assertEqual(sum(isinstance(item, Slot) for item in template), 3)
+
+    def test_larger_image(self):
+        lena = Image.open(get_asset_filename('320x256.png'))
+        image = Image.new('RGB', (400, 300), (255, 255, 255))
+        image.paste(lena, (0, 0))
+        s = color.MartinM1(image, 48000, 16)
+        self.assertEqual(s.row(10, 0), self.lena.row(10, 0))
+        self.assertEqual(list(s.gen_freq_bits()), list(self.lena.gen_freq_bits()))
+
+    def test_sample_count(self):
+        for mode in (color.MartinM1, color.ScottieS2, color.Robot36,
+                color.PD90, color.WraaseSC2120):
+            s = mode(Image.new('RGB', (mode.WIDTH, mode.HEIGHT)), 11025, 8)
+            s.vox_enabled = True
+            s.add_fskid_text('HA5VSA')
+            expected = sstv.count_samples((msec for _, msec
+                in s.gen_freq_bits()), 11025)
+            self.assertEqual(expected, s.sample_count())
+            self.assertEqual(expected / 11025, s.duration())
+        self.lena.samples_per_sec = 8000
+        self.assertEqual(len(list(self.lena.gen_values())),
+                self.lena.sample_count())
+
+
+class TestRobot36(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.new('RGB', (320, 240), (255, 0, 0))
+        self.s = color.Robot36(self.image, 48000, 16)
+
+    def test_line_template_parity(self):
+        even = self.s.line_template(0)
+        odd = self.s.line_template(1)
+        self.assertIs(even, self.s.line_template(2))
+        self.assertNotEqual(even, odd)
+        self.assertEqual(even[-1].channel, 2)
+        self.assertEqual(odd[-1].channel, 1)
+
+    def test_encode_line_length(self):
+        for line in (0, 1):
+            self.assertEqual(len(list(self.s.encode_line(line))), 3 + 2 * 320)
+
+
+class TestPD90(unittest.TestCase):
+
+    def setUp(self):
+        lena = Image.open(get_asset_filename('320x256.png'))
+        self.s = color.PD90(lena, 48000, 16)
+
+    def test_row_freqs_chroma(self):
+        for line in (0, 10, 254):
+            for channel, index in (('cb', 1), ('cr', 2)):
+                expected = [color.SUM_TO_FREQ[p0 + p1] for p0, p1 in zip(
+                    self.s.row(line, index), self.s.row(line + 1, index))]
+                self.assertEqual(expected, self.s.row_freqs(line, channel))
+
+    def test_sum_row_pairs(self):
+        plane = bytes(range(256)) * 3
+        expected = [a + b for a, b in zip(plane[0:64] + plane[128:192],
+            plane[64:128] + plane[192:256])] * 3
+        self.assertEqual(expected, list(color.sum_row_pairs(plane, 64)))
+        with mock.patch.object(vectorized, 'numpy', None):
+            self.assertEqual(expected, list(color.sum_row_pairs(plane, 64)))
@@ -0,0 +1,72 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+import mock
+from PIL import Image
+
+from pysstv import color, decoder, grayscale, vectorized
+from pysstv.prepare import prepare_image
+from pysstv.tests.common import get_asset_filename
+
+
+@unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+class TestDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.source = Image.open(get_asset_filename('320x256.png'))
+        self.tmp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def encode(self, mode, rate, bits):
+        image = prepare_image(self.source, mode, 'stretch')
+        s = mode(image, rate, bits)
+        s.vox_enabled = True
+        s.add_fskid_text('HA5XYZ')
+        return image, s
+
+    def test_decode_wav(self):
+        image, s = self.encode(grayscale.Robot8BW, 11025, 8)
+        filename = path.join(self.tmp.name, 'robot8bw.wav')
+        s.write_wav(filename)
+        decoded = decoder.decode_wav(filename)
+        self.assertIs(grayscale.Robot8BW, decoded.mode)
+        self.assertEqual(0x02, decoded.vis_code)
+        self.assertEqual(int(11025 * 0.8 + 11025 * 0.61), decoded.vis_start)
+        self.assertGreater(decoder.psnr(image, decoded.image), 30)
+
+    def test_chroma(self):
+        for mode in (color.Robot36, color.PD90):
+            image, s = self.encode(mode, 8000, 16)
+            decoded = decoder.decode(s.render(), 8000)
+            self.assertIs(mode, decoded.mode)
+            self.assertEqual('YCbCr', decoded.image.mode)
+            self.assertGreater(decoder.psnr(image, decoded.image), 25)
+
+    def test_find_mode(self):
+        self.assertIs(color.PasokonP7, decoder.find_mode(0x73))
+        self.assertRaises(ValueError, decoder.find_mode, 0x7e)
+
+    def test_no_vis(self):
+        s = grayscale.Robot8BW(Image.new('L', (160, 120)), 8000, 16)
+        samples = s.render()[8000:]
+        self.assertRaises(ValueError, decoder.decode, samples, 8000)
+
+    def test_psnr(self):
+        self.assertEqual(float('inf'), decoder.psnr(self.source, self.source))
+        darker = self.source.point(lambda value: max(value - 1, 0))
+        self.assertGreater(decoder.psnr(self.source, darker), 48)
+
+    def test_main(self):
+        image, s = self.encode(grayscale.Robot8BW, 8000, 16)
+        filename = path.join(self.tmp.name, 'robot8bw.wav')
+        source = path.join(self.tmp.name, 'source.png')
+        s.write_wav(filename)
+        image.save(source)
+        argv = ['pysstv.decoder', filename, '--image', source]
+        with mock.patch('sys.argv', argv + ['--min-psnr', '30']):
+            decoder.main()
+        with mock.patch('sys.argv', argv + ['--min-psnr', '99']):
+            self.assertRaises(SystemExit, decoder.main)
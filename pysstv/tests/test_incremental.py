@@ -0,0 +1,56 @@
+import unittest
+from array import array
+
+from PIL import Image
+
+from pysstv import vectorized
+from pysstv.color import PD90
+from pysstv.grayscale import Robot8BW
+from pysstv.incremental import IncrementalEncoder
+
+
+class TestIncrementalEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.linear_gradient('L').resize((160, 120))
+
+    def encode(self, mode, image, engine='python'):
+        s = mode(image, 8000, 16, engine=engine)
+        s.dither_seed = 42
+        s.add_fskid_text('HA5VSA')
+        return s
+
+    def assertClose(self, expected, actual):
+        self.assertEqual(len(expected), len(actual))
+        self.assertLessEqual(max(abs(e - a)
+            for e, a in zip(expected, actual)), 1)
+
+    def samples(self, source):
+        return [v for block in source.gen_sample_blocks() for v in block]
+
+    def check_update(self, mode, engine):
+        image = self.image.convert('RGB').resize((mode.WIDTH, mode.HEIGHT))
+        encoder = IncrementalEncoder(self.encode(mode, image, engine))
+        self.assertClose(self.samples(self.encode(mode, image, engine)),
+                self.samples(encoder))
+        self.assertEqual(encoder.update(image.copy()), [])
+        changed = image.copy()
+        changed.paste((255, 0, 0), (10, 21, 30, 24))
+        lines = encoder.update(changed)
+        self.assertEqual(lines, sorted(set(row - row % mode.LINE_STEP
+            for row in range(21, 24))))
+        self.assertClose(self.samples(self.encode(mode, changed, engine)),
+                self.samples(encoder))
+
+    def test_update(self):
+        self.check_update(Robot8BW, 'python')
+
+    def test_python_output_type(self):
+        encoder = IncrementalEncoder(self.encode(Robot8BW, self.image))
+        encoder.update(self.image.transpose(Image.FLIP_TOP_BOTTOM))
+        for block in encoder.gen_sample_blocks():
+            self.assertIsInstance(block, array)
+
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not installed')
+    def test_update_numpy(self):
+        self.check_update(PD90, 'numpy')
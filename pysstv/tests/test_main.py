@@ -0,0 +1,41 @@
+import unittest
+from os import mkfifo, path
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+import mock
+from PIL import Image
+
+from pysstv import __main__ as pysstv_main, grayscale
+from pysstv.tests.common import get_asset_filename
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        image = Image.linear_gradient('L').resize((160, 120))
+        self.s = grayscale.Robot8BW(image, 8000, 16)
+        self.s.dither_seed = 42
+
+    def test_write_output_devices(self):
+        argv = ['pysstv', '--mode', 'Robot8BW', '--rate', '8000', '--resize',
+                get_asset_filename('320x256.png'), path.devnull]
+        with mock.patch('sys.argv', argv):
+            pysstv_main.main()
+        with TemporaryDirectory() as tmp:
+            expected = path.join(tmp, 'expected.wav')
+            self.s.write_wav(expected)
+            fifo = path.join(tmp, 'fifo.wav')
+            mkfifo(fifo)
+            received = []
+
+            def read():
+                with open(fifo, 'rb') as f:
+                    received.append(f.read())
+
+            reader = Thread(target=read)
+            reader.start()
+            pysstv_main.write_output(self.s, fifo, 'wav')
+            reader.join()
+            with open(expected, 'rb') as e:
+                self.assertEqual(e.read(), received[0])
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import mock
+from PIL import Image
+
+from pysstv import color, grayscale, modes
+from pysstv.sstv import SSTV
+
+
+class FakeEntryPoint(object):
+
+    def __init__(self, name, target):
+        self.name = name
+        self.value = target
+
+    def load(self):
+        return modes.ModeInfo(self.name, 0, 0, 0, 0, self.value).load()
+
+
+class TestModes(unittest.TestCase):
+
+    def setUp(self):
+        self.registered = mock.patch.dict(modes.REGISTERED_MODES, clear=True)
+        self.registered.start()
+        self.loaded = mock.patch.object(modes, 'entry_points_loaded', False)
+        self.loaded.start()
+
+    def tearDown(self):
+        self.loaded.stop()
+        self.registered.stop()
+
+    def test_builtin_metadata(self):
+        classes = color.MODES + grayscale.MODES
+        self.assertEqual([mode.__name__ for mode in classes],
+                list(modes.BUILTIN_MODES))
+        for mode in classes:
+            info = modes.BUILTIN_MODES[mode.__name__]
+            self.assertIs(info.load(), mode)
+            self.assertEqual(info._replace(duration=0),
+                    modes.ModeInfo.from_class(mode)._replace(duration=0))
+            s = mode(Image.new('RGB', (mode.WIDTH, mode.HEIGHT)), 48000, 16)
+            self.assertAlmostEqual(info.duration, s.duration(), delta=0.01)
+
+    def test_find(self):
+        self.assertIs(modes.find('PD90').load(), color.PD90)
+        with mock.patch('pysstv.modes.gen_entry_points', return_value=[]):
+            self.assertRaises(KeyError, modes.find, 'Foo')
+
+    def test_entry_points(self):
+        entry_points = [FakeEntryPoint('Robot8BWCopy', 'pysstv.grayscale:Robot8BW'),
+                FakeEntryPoint('Broken', 'pysstv.grayscale:NoSuchMode')]
+        with mock.patch('pysstv.modes.gen_entry_points',
+                return_value=entry_points) as gen_entry_points:
+            with self.assertWarns(RuntimeWarning):
+                info = modes.find('Robot8BWCopy')
+            self.assertIs(info.load(), grayscale.Robot8BW)
+            self.assertEqual(info.vis_code, grayscale.Robot8BW.VIS_CODE)
+            self.assertIn('Robot8BWCopy', modes.get_modes())
+            self.assertNotIn('Broken', modes.get_modes())
+            gen_entry_points.assert_called_once_with()
+
+    def test_no_importlib_metadata(self):
+        with mock.patch.dict(sys.modules, {'importlib.metadata': None}):
+            self.assertEqual([], modes.gen_entry_points())
+            self.assertRaises(KeyError, modes.find, 'Foo')
+        self.assertIn('PD90', modes.get_modes())
+
+    def test_register(self):
+        class Tone(SSTV):
+            VIS_CODE = 0x7f
+            WIDTH = HEIGHT = 1
+
+            def gen_image_tuples(self):
+                yield 1000, 2000
+
+        info = modes.register(Tone)
+        self.assertIs(modes.find('Tone'), info)
+        self.assertAlmostEqual(info.duration, 2.91)
+
+    def test_cli_imports(self):
+        code = ('import sys; sys.argv = ["pysstv", "--list-modes"]\n'
+                'from pysstv.__main__ import main\n'
+                'try: main()\n'
+                'except SystemExit: pass\n'
+                'print([m for m in ("PIL", "numpy", "pysstv.color") '
+                'if m in sys.modules])')
+        output = subprocess.check_output([sys.executable, '-c', code],
+                universal_newlines=True).splitlines()
+        self.assertEqual(len(modes.BUILTIN_MODES) + 1, len(output))
+        self.assertEqual('[]', output[-1])
+
+    def test_cli_list_modes_broken_pipe(self):
+        read, write = os.pipe()
+        os.close(read)
+        try:
+            process = subprocess.run([sys.executable, '-m', 'pysstv',
+                '--list-modes'], stdout=write, stderr=subprocess.PIPE,
+                universal_newlines=True)
+        finally:
+            os.close(write)
+        self.assertEqual(1, process.returncode)
+        self.assertEqual('', process.stderr)
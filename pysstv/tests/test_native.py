@@ -0,0 +1,88 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import mock
+from PIL import Image
+
+from pysstv import color, grayscale, native
+
+
+class TestNative(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {'PYSSTV_CACHE': self.tmp.name})
+        self.env.start()
+        self.kernels = mock.patch.dict(native.KERNELS, clear=True)
+        self.kernels.start()
+
+    def tearDown(self):
+        self.kernels.stop()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def render(self, mode, engine, bits=16):
+        gradient = Image.linear_gradient('L').resize((mode.WIDTH, mode.HEIGHT))
+        image = Image.merge('RGB', (gradient,
+            gradient.transpose(Image.FLIP_TOP_BOTTOM),
+            Image.radial_gradient('L').resize(gradient.size)))
+        s = mode(image, 4000, bits, engine=engine)
+        s.vox_enabled = True
+        s.dither_seed = 7
+        s.add_fskid_text('HA5XYZ')
+        return b''.join(bytes(block) for block in s.gen_sample_blocks(1000))
+
+    def assertSameOutput(self, mode, bits=16):
+        self.assertEqual(self.render(mode, 'python', bits),
+                self.render(mode, 'native', bits))
+
+    @unittest.skipIf(native.find_compiler() is None, 'No C compiler')
+    def test_modes(self):
+        for mode in (grayscale.Robot8BW, color.MartinM2, color.ScottieS2,
+                color.Robot36, color.PD90):
+            self.assertSameOutput(mode)
+        self.assertSameOutput(grayscale.Robot8BW, 8)
+        self.assertEqual(5, len(native.KERNELS))
+        self.assertNotIn(None, native.KERNELS.values())
+
+    @unittest.skipIf(native.find_compiler() is None, 'No C compiler')
+    def test_instance_timing(self):
+        image = Image.linear_gradient('L').resize((160, 120))
+        outputs = []
+        for scan in (None, 70):
+            for engine in ('python', 'native'):
+                s = grayscale.Robot8BW(image, 4000, 16, engine=engine)
+                s.dither_seed = 7
+                if scan is not None:
+                    s.SCAN = scan
+                outputs.append(b''.join(bytes(block)
+                    for block in s.gen_sample_blocks()))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[2], outputs[3])
+        self.assertNotEqual(len(outputs[0]), len(outputs[2]))
+        self.assertEqual(2, len(native.KERNELS))
+
+    @unittest.skipIf(native.find_compiler() is None, 'No C compiler')
+    def test_cache(self):
+        s = grayscale.Robot8BW(Image.new('L', (160, 120)), 4000, 16)
+        self.assertIsNotNone(native.get_kernel(s))
+        self.assertEqual(1, len(os.listdir(self.tmp.name)))
+        native.KERNELS.clear()
+        with mock.patch('pysstv.native.compile_kernel') as compile_kernel:
+            self.assertIsNotNone(native.get_kernel(s))
+            compile_kernel.assert_not_called()
+
+    def test_no_compiler(self):
+        with mock.patch.dict(os.environ, {'CC': 'no-such-compiler'}):
+            self.assertSameOutput(grayscale.Robot8BW)
+        self.assertEqual([None], list(native.KERNELS.values()))
+
+    def test_compiler_error(self):
+        with mock.patch.dict(os.environ, {'CC': 'false'}):
+            with self.assertWarns(RuntimeWarning):
+                self.assertSameOutput(grayscale.Robot8BW)
+
+    def test_unsupported(self):
+        s = grayscale.Robot8BW(Image.new('L', (160, 120)), 4000, 24)
+        self.assertIsNone(native.get_kernel(s))
@@ -0,0 +1,44 @@
+import unittest
+
+from pysstv import vectorized
+from pysstv.oscillator import NCO
+from pysstv.sstv import SSTV
+
+
+class TestNCO(unittest.TestCase):
+
+    def setUp(self):
+        self.s = SSTV(False, 44100, 16)
+        self.s.VIS_CODE = 0x2c
+        self.s.vox_enabled = True
+        self.exact = list(self.s.gen_values())
+
+    def assertWithinBound(self, nco):
+        self.s.oscillator = nco
+        actual = list(self.s.gen_values())
+        self.assertEqual(len(self.exact), len(actual))
+        bound = nco.max_error(44100)
+        error = max(abs(e - a) for e, a in zip(self.exact, actual))
+        self.assertLessEqual(error, bound)
+        return actual
+
+    def test_table(self):
+        self.assertWithinBound(NCO(1024))
+
+    def test_interpolate(self):
+        nco = NCO(1024, interpolate=True)
+        self.assertWithinBound(nco)
+        self.assertGreater(nco.sfdr(44100), NCO(1024).sfdr(44100))
+
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+    def test_numpy(self):
+        for nco in (NCO(4096), NCO(256, interpolate=True)):
+            expected = self.assertWithinBound(nco)
+            self.s.engine = 'numpy'
+            self.assertEqual(expected, list(self.s.gen_values()))
+            self.s.engine = 'python'
+
+    def test_table_size(self):
+        self.assertRaises(ValueError, NCO, 1000)
+        self.assertEqual(NCO(64), NCO(64))
+        self.assertNotEqual(NCO(64), NCO(64, interpolate=True))
@@ -0,0 +1,50 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from PIL import Image
+
+from pysstv import grayscale, parallel, vectorized
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        image = Image.linear_gradient('L').resize((160, 120))
+        self.s = grayscale.Robot8BW(image, 8000, 16)
+        self.s.vox_enabled = True
+        self.s.dither_seed = 42
+
+    def render(self):
+        return b''.join(bytes(block) for block in self.s.gen_sample_blocks())
+
+    def assertParallelIdentical(self):
+        expected = self.render()
+        self.s.workers = 2
+        self.assertEqual(expected, self.render())
+
+    def test_python(self):
+        self.assertParallelIdentical()
+
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+    def test_numpy(self):
+        self.s.engine = 'numpy'
+        self.assertParallelIdentical()
+
+    def test_write_wav_mmap(self):
+        with TemporaryDirectory() as tmp:
+            expected = path.join(tmp, 'expected.wav')
+            self.s.nchannels = 2
+            self.s.write_wav(expected)
+            actual = path.join(tmp, 'actual.wav')
+            for workers in (1, 2):
+                self.s.workers = workers
+                self.s.write_wav_mmap(actual)
+                with open(expected, 'rb') as e, open(actual, 'rb') as a:
+                    self.assertEqual(e.read(), a.read())
+
+    def test_split(self):
+        counts = [10, 0, 5, 5, 10, 10]
+        spans = parallel.split(counts, 4)
+        self.assertEqual(spans, [(0, 1, 0), (1, 4, 10), (4, 5, 20), (5, 6, 30)])
+        self.assertEqual(parallel.split(counts, 1), [(0, 6, 0)])
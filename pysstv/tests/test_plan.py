@@ -0,0 +1,104 @@
+import unittest
+import struct
+
+from PIL import Image
+
+from pysstv import color, grayscale
+from pysstv.plan import Plan
+from pysstv.sstv import SSTV
+from pysstv.tests.common import get_asset_filename
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self):
+        lena = Image.open(get_asset_filename('320x256.png'))
+        self.s = color.MartinM1(lena, 48000, 16)
+        self.s.vox_enabled = True
+        self.s.add_fskid_text('HA5VSA')
+        self.plan = Plan.from_sstv(self.s)
+
+    def test_from_sstv(self):
+        self.assertEqual(list(self.s.gen_freq_bits()), list(self.plan))
+
+    def test_sections(self):
+        kinds = [section.kind for section in self.plan.sections]
+        self.assertEqual(kinds, ['vox', 'vis'] + ['line'] * 256 + ['fskid'])
+        line = self.plan.find('line', 10)
+        expected = [(1200, self.s.SYNC)] + list(self.s.encode_line(10))
+        actual = list(zip(self.plan.freqs[line.start:line.stop],
+            self.plan.msecs[line.start:line.stop]))
+        self.assertEqual(expected, actual)
+        self.assertRaises(KeyError, self.plan.find, 'line', 256)
+
+    def test_gen_partial(self):
+        freqs = []
+        msecs = []
+        for plan in Plan.gen_partial(self.s.gen_sections(), 4096):
+            freqs.extend(plan.freqs)
+            msecs.extend(plan.msecs)
+        self.assertEqual(list(self.plan.freqs), freqs)
+        self.assertEqual(list(self.plan.msecs), msecs)
+
+    def test_position(self):
+        lo, hi = self.plan.line_range(200, 256)
+        self.assertEqual(lo, self.plan.find('line', 200).start)
+        self.assertEqual(hi, self.plan.find('line', 255).stop)
+        self.assertRaises(KeyError, self.plan.line_range, 256, 300)
+        full = self.plan.schedule(48000)
+        position = self.plan.position(lo, 48000)
+        self.assertEqual(position.sample, sum(full.counts[:lo]))
+        self.assertEqual(position.offset, full.phases[lo])
+        rest = self.plan.slice(lo).schedule(48000,
+                position.offset, position.carry)
+        self.assertEqual(full.phases[lo:], rest.phases)
+        self.assertEqual(full.counts[lo:], rest.counts)
+
+    def test_line_sample_blocks(self):
+        self.s.dither_seed = 7
+        self.s.samples_per_sec = 8000
+        full = [v for block in self.s.gen_sample_blocks() for v in block]
+        position, lines = self.s.locate_lines(250, 256)
+        part = [v for block in self.s.gen_line_sample_blocks(250, 256, 1000)
+                for v in block]
+        lo, hi = self.plan.line_range(250, 256)
+        self.assertEqual(len(lines), hi - lo)
+        self.assertEqual(full[position.sample:position.sample + len(part)],
+                part)
+
+    def test_line_pairs(self):
+        s = color.PD90(Image.open(get_asset_filename('320x256.png')), 8000, 16)
+        s.dither_seed = 7
+        plan = Plan.from_sstv(s)
+        self.assertEqual((plan.find('line', 0).start, plan.find('line', 2).stop),
+                plan.line_range(1, 3, s.LINE_STEP))
+        position, lines = s.locate_lines(1, 3)
+        self.assertEqual(plan.find('line', 0).start, position.segment)
+        full = [v for block in s.gen_sample_blocks() for v in block]
+        part = [v for block in s.gen_line_sample_blocks(1, 3) for v in block]
+        self.assertEqual(full[position.sample:position.sample + len(part)],
+                part)
+        self.assertEqual(sum(plan.schedule(8000).counts[position.segment:
+            plan.find('line', 2).stop]), len(part))
+
+    def test_tobytes(self):
+        expected = b''.join(struct.pack('ff', freq, msec)
+                for freq, msec in self.s.gen_freq_bits())
+        data = self.plan.tobytes()
+        self.assertEqual(expected, data)
+        plan = Plan.frombytes(data)
+        self.assertEqual(len(self.plan), len(plan))
+        self.assertEqual(data, plan.tobytes())
+
+    def test_grayscale_pairs(self):
+        image = Image.new('L', (160, 120))
+        plan = Plan.from_sstv(grayscale.Robot8BW(image, 48000, 16))
+        self.assertEqual(len(plan.sections), 1 + 120)
+
+    def test_overridden_gen_freq_bits(self):
+        class Sine(SSTV):
+            def gen_freq_bits(self):
+                return [(1750, 1000)]
+        plan = Plan.from_sstv(Sine(None, 48000, 16))
+        self.assertEqual([(1750, 1000)], list(plan))
+        self.assertEqual('other', plan.sections[0].kind)
@@ -0,0 +1,66 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from PIL import Image
+
+from pysstv import color, grayscale, prepare
+
+
+class TestPrepare(unittest.TestCase):
+
+    def setUp(self):
+        gradient = Image.linear_gradient('L').resize((400, 200))
+        self.image = Image.merge('RGB', (gradient,
+            gradient.transpose(Image.FLIP_LEFT_RIGHT),
+            Image.radial_gradient('L').resize(gradient.size)))
+
+    def test_layout(self):
+        self.assertEqual(((320, 256), (0, 0, 400, 200), (0, 0)),
+                prepare.layout((400, 200), (320, 256), 'stretch'))
+        self.assertEqual(((320, 256), (75, 0, 325, 200), (0, 0)),
+                prepare.layout((400, 200), (320, 256), 'crop'))
+        self.assertEqual(((320, 160), (0, 25, 100, 75), (0, 0)),
+                prepare.layout((100, 100), (320, 160), 'crop'))
+        self.assertEqual(((320, 160), (0, 0, 400, 200), (0, 48)),
+                prepare.layout((400, 200), (320, 256), 'pad'))
+        self.assertEqual(((160, 160), (0, 0, 100, 100), (80, 0)),
+                prepare.layout((100, 100), (320, 160), 'pad'))
+        self.assertEqual(((320, 160), (0, 0, 640, 320), (0, 0)),
+                prepare.layout((640, 320), (320, 160), 'pad'))
+
+    def test_fits(self):
+        for mode in (grayscale.Robot8BW, color.MartinM1, color.PD90):
+            for fit in prepare.FITS:
+                image = prepare.prepare_image(self.image, mode, fit)
+                self.assertEqual((mode.WIDTH, mode.HEIGHT), image.size)
+                self.assertEqual(mode.IMAGE_MODE, image.mode)
+
+    def test_pad(self):
+        image = prepare.prepare_image(self.image, color.Robot36, 'pad')
+        self.assertEqual((0, 128, 128), image.getpixel((0, 0)))
+        self.assertEqual((0, 128, 128), image.getpixel((319, 239)))
+        self.assertNotEqual((0, 128, 128), image.getpixel((160, 120)))
+
+    def test_no_fit(self):
+        image = prepare.prepare_image(self.image, grayscale.Robot8BW)
+        self.assertEqual(self.image.crop((0, 0, 160, 120)).convert('L').tobytes(),
+                image.tobytes())
+        self.assertRaises(ValueError, prepare.prepare_image, self.image,
+                color.PD120)
+        self.assertRaises(ValueError, prepare.prepare_image, self.image,
+                color.PD120, 'squeeze')
+
+    def test_draft(self):
+        with TemporaryDirectory() as tmp:
+            filename = path.join(tmp, 'image.jpg')
+            self.image.resize((3200, 1600)).save(filename, quality=95)
+            with Image.open(filename) as full:
+                full.load()
+                expected = prepare.prepare_image(full, color.Robot36, 'crop')
+            actual = prepare.open_image(filename, color.Robot36, 'crop')
+        self.assertEqual(expected.size, actual.size)
+        self.assertEqual('YCbCr', actual.mode)
+        error = max(abs(e - a) for e, a in zip(expected.tobytes(),
+            actual.tobytes()))
+        self.assertLessEqual(error, 8)
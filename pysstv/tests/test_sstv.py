@@ -4,8 +4,12 @@ from itertools import islice
 import mock
 from mock import MagicMock
 import hashlib
+import struct
+import wave
 
-from pysstv import sstv
+from PIL import Image
+
+from pysstv import grayscale, sstv, vectorized
 from pysstv.sstv import SSTV
 from pysstv.tests.common import load_pickled_asset
 
@@ -48,6 +52,19 @@ class TestSSTV(unittest.TestCase):
         for e, g in zip(expected, gen_values):
             self.assertAlmostEqual(e, g, delta=0.000000001)
 
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+    def test_gen_values_numpy(self):
+        s = SSTV(False, 48000, 16, engine='numpy')
+        s.VIS_CODE = 0x00
+        expected = list(self.s.gen_values())
+        actual = list(s.gen_values())
+        self.assertEqual(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            self.assertAlmostEqual(e, a, delta=0.000000001)
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, SSTV, False, 48000, 16, engine='foo')
+
     def test_gen_samples(self):
         gen_values = self.s.gen_samples()
         # gen_samples uses random to avoid quantization noise
@@ -61,6 +78,45 @@ class TestSSTV(unittest.TestCase):
         for e, a in zip(expected, actual):
             self.assertAlmostEqual(e, a, delta=1)
 
+    def test_gen_samples_seed(self):
+        self.s.dither_seed = 42
+        first = list(self.s.gen_samples())
+        second = list(self.s.gen_samples())
+        self.assertEqual(first, second)
+
+    def test_quantizer_blocks(self):
+        values = list(self.s.gen_values())
+        whole = sstv.Quantizer(16, 42).quantize(values)
+        quantizer = sstv.Quantizer(16, 42)
+        split = quantizer.quantize(values[:1000]) + quantizer.quantize(values[1000:])
+        self.assertEqual(whole, split)
+
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+    def test_gen_samples_numpy(self):
+        s = SSTV(False, 48000, 16, engine='numpy')
+        s.VIS_CODE = 0x00
+        s.dither_seed = self.s.dither_seed = 42
+        expected = list(self.s.gen_samples())
+        actual = list(s.gen_samples())
+        self.assertEqual(expected, actual)
+
+    def test_preamble_cache(self):
+        cache = sstv.PreambleCache(maxsize=1)
+        self.s.dither_seed = 42
+        self.s.vox_enabled = True
+        expected = list(self.s.gen_samples())
+        self.s.preamble_cache = cache
+        self.assertEqual(expected, list(self.s.gen_samples()))
+        self.assertEqual(len(cache.entries), 1)
+        preamble, = cache.entries.values()
+        self.assertEqual(preamble.segments, 8 + 13)
+        self.assertEqual(expected, list(self.s.gen_samples()))
+        self.s.vox_enabled = False
+        list(self.s.gen_samples())
+        self.assertEqual(len(cache.entries), 1)
+        preamble, = cache.entries.values()
+        self.assertEqual(preamble.segments, 13)
+
     def test_write_wav(self):
         self.maxDiff = None
         bio = BytesIO()
@@ -73,7 +129,130 @@ class TestSSTV(unittest.TestCase):
         actual = hashlib.md5(data).hexdigest()
         self.assertEqual(expected, actual)
 
+    def test_write_wav_file_stereo(self):
+        self.s.dither_seed = 42
+        mono = BytesIO()
+        self.s.write_wav_file(mono, chunk_frames=1000)
+        self.s.nchannels = 2
+        stereo = BytesIO()
+        self.s.write_wav_file(stereo, chunk_frames=1000)
+        mono.seek(0)
+        stereo.seek(0)
+        with wave.open(mono) as m, wave.open(stereo) as s:
+            self.assertEqual(s.getnchannels(), 2)
+            self.assertEqual(m.getnframes(), s.getnframes())
+            mono_frames = m.readframes(m.getnframes())
+            stereo_frames = s.readframes(s.getnframes())
+        self.assertEqual(mono_frames[0::2], stereo_frames[0::4])
+        self.assertEqual(mono_frames[1::2], stereo_frames[3::4])
+
+    def test_write_wav_file_unseekable(self):
+        self.s.dither_seed = 42
+        seekable = BytesIO()
+        self.s.write_wav_file(seekable)
+        unseekable = BytesIO()
+        unseekable.seekable = lambda: False
+        unseekable.seek = unseekable.tell = MagicMock(side_effect=OSError)
+        self.s.write_wav_file(unseekable)
+        self.assertEqual(seekable.getvalue(), unseekable.getvalue())
+
+    def test_write_raw_file(self):
+        self.s.dither_seed = 42
+        wav = BytesIO()
+        self.s.write_wav_file(wav)
+        wav.seek(0)
+        with wave.open(wav) as w:
+            frames = w.readframes(w.getnframes())
+        raw = BytesIO()
+        self.s.write_raw_file(raw, chunk_frames=1000)
+        self.assertEqual(frames, raw.getvalue())
+
+    def test_render_into(self):
+        self.s.dither_seed = 42
+        self.s.nchannels = 2
+        raw = BytesIO()
+        self.s.write_raw_file(raw)
+        size = len(raw.getvalue())
+        buffer = bytearray(size + 10)
+        self.assertEqual(self.s.render_into(buffer, 10, 1000), size)
+        self.assertEqual(bytes(buffer[10:]), raw.getvalue())
+        self.assertRaises(ValueError, self.s.render_into, buffer, 11)
+        samples = self.s.render()
+        self.assertEqual(samples.format, 'h')
+        self.assertEqual(samples.tobytes(), raw.getvalue())
+
+    def test_render_into_shared_memory(self):
+        from multiprocessing.shared_memory import SharedMemory
+        self.s.dither_seed = 42
+        size = self.s.sample_count() * 2
+        shm = SharedMemory(create=True, size=size)
+        try:
+            self.s.render_into(shm.buf)
+            self.assertEqual(bytes(shm.buf[:size]), self.s.render().tobytes())
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_write_float_file(self):
+        floats = BytesIO()
+        self.s.nchannels = 2
+        self.s.write_float_file(floats, chunk_frames=1000)
+        values = struct.unpack('<{0}f'.format(len(floats.getvalue()) // 4),
+                floats.getvalue())
+        expected = list(self.s.gen_values())
+        self.assertEqual(len(values), 2 * len(expected))
+        for actual, value in zip(values[1::2], expected):
+            self.assertAlmostEqual(actual, value, places=6)
+
+    def test_unsupported_bits(self):
+        self.s.bits = 24
+        self.assertEqual(24, len(list(islice(self.s.gen_samples(), 24))))
+        for write in (self.s.write_wav_file, self.s.write_raw_file,
+                self.s.render_into):
+            with self.assertRaisesRegex(ValueError, 'bits per sample 24'):
+                write(BytesIO())
+        self.assertRaises(ValueError, self.s.render)
+        self.assertRaises(ValueError, self.s.write_wav_mmap, '/nonexistent')
+
+    def test_overridden_constants(self):
+        s = grayscale.Robot8BW(Image.new('L', (160, 120)), 8000, 16)
+        self.assertEqual(71600, s.sample_count())
+        s.SYNC = 20
+        s.SCAN = 70
+        count = len(list(s.gen_values()))
+        self.assertEqual(count, s.sample_count())
+        self.assertEqual(count, len(s.render()))
+        self.assertEqual(71600, grayscale.Robot8BW(s.image, 8000, 16).sample_count())
+
     def test_init(self):
         self.assertEqual(self.s.image, False)
         self.assertEqual(self.s.samples_per_sec, 48000)
         self.assertEqual(self.s.bits, 16)
+
+
+class Tone(grayscale.Robot8BW):
+    def gen_image_tuples(self):
+        yield 1000, 1000
+
+
+class TestOverriddenImageTuples(unittest.TestCase):
+
+    def setUp(self):
+        self.s = Tone(Image.new('L', (160, 120)), 8000, 16)
+
+    def test_sections(self):
+        self.assertEqual(['vis', 'image'],
+                [kind for kind, _, _ in self.s.gen_sections()])
+        count = len(list(self.s.gen_values()))
+        self.assertEqual(15280, count)
+        self.assertEqual(count, self.s.sample_count())
+        self.assertEqual(count, len(self.s.render()))
+        self.assertEqual(count, sum(len(block)
+            for block in self.s.gen_sample_blocks()))
+
+    @unittest.skipIf(vectorized.numpy is None, 'NumPy is not available')
+    def test_numpy(self):
+        self.s.engine = 'numpy'
+        self.assertEqual(15280, sum(len(block)
+            for block in self.s.gen_value_blocks()))
+        self.assertEqual(15280, len(self.s.render()))
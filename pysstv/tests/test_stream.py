@@ -0,0 +1,52 @@
+import asyncio
+import unittest
+from io import BytesIO
+
+from pysstv.sstv import SSTV
+from pysstv.stream import RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_wrap_around(self):
+        ring = RingBuffer(8)
+        self.assertTrue(ring.write(b'abcdef'))
+        self.assertEqual(ring.read(4), b'abcd')
+        self.assertTrue(ring.write(b'ghijk'))
+        self.assertEqual(ring.size, 7)
+        self.assertEqual(ring.read(10), b'efghijk')
+        ring.abort()
+        self.assertFalse(ring.write(b'x'))
+
+
+class TestStreamer(unittest.TestCase):
+
+    def setUp(self):
+        self.s = SSTV(False, 48000, 16)
+        self.s.VIS_CODE = 0x00
+        self.s.SYNC = 7
+        self.s.dither_seed = 42
+        self.s.nchannels = 2
+        raw = BytesIO()
+        self.s.write_raw_file(raw)
+        self.expected = raw.getvalue()
+
+    def test_async_for(self):
+        async def consume(streamer):
+            return [chunk async for chunk in streamer]
+        streamer = self.s.stream(chunk_frames=1000, buffer_chunks=2)
+        chunks = asyncio.run(consume(streamer))
+        self.assertEqual(b''.join(chunks), self.expected)
+        self.assertTrue(all(len(chunk) == 4000 for chunk in chunks[:-1]))
+        self.assertTrue(streamer.finished)
+
+    def test_read(self):
+        streamer = self.s.stream(chunk_frames=1000, buffer_chunks=100)
+        streamer.thread.join()
+        self.assertEqual(streamer.lead_time, len(self.expected) / 4 / 48000)
+        data = []
+        while not streamer.finished:
+            data.append(streamer.read(512))
+        self.assertEqual(b''.join(data), self.expected)
+        self.assertEqual(streamer.underruns, 0)
+        self.assertEqual(streamer.read(512), b'')
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""
+NumPy-backed counterparts of the sample generators in the sstv module.
+
+Instead of calling math.sin for every single sample in an interpreted loop,
+these helpers process whole blocks of samples at once, while keeping the
+phase-continuous behaviour of SSTV.gen_values. NumPy is optional, if it
+cannot be imported, the numpy attribute of this module is None.
+"""
+
+from __future__ import division
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SEGMENT_BATCH = 4096
+
+
+def gen_value_blocks(plans, samples_per_sec, block_size, offset=0, carry=0,
+        oscillator=None, clock=None):
+    """generates arrays of samples between -1 and +1 from consecutive
+       plans that make up a transmission
+
+       produces the same values as SSTV.gen_values (within float tolerance)
+       including the phase offset and the fractional sample carry across
+       segments, each array has at most block_size elements, offset and
+       carry are the phase and fractional sample carry at the start,
+       oscillator replaces numpy.sin if it's not None, clock is an
+       optional clock.ExactClock
+    """
+    for plan in plans:
+        schedule = plan.schedule(samples_per_sec, offset, carry, clock)
+        offset = schedule.offset
+        carry = schedule.carry
+        yield from render(numpy.asarray(schedule.freq_factors),
+                numpy.asarray(schedule.counts),
+                numpy.asarray(schedule.phases), block_size, oscillator)
+
+
+def render(freq_factors, counts, phases, block_size, oscillator=None):
+    """generates arrays of at most block_size samples for segments
+       described by their angular frequency per sample, their length
+       in samples and their starting phase"""
+    ends = numpy.cumsum(counts)
+    starts = ends - counts
+    total = int(ends[-1]) if len(ends) else 0
+    if oscillator is not None:
+        accs, incs = oscillator.prepare(freq_factors, phases)
+    for lo in range(0, total, block_size):
+        index = numpy.arange(lo, min(lo + block_size, total))
+        seg = numpy.searchsorted(ends, index, side='right')
+        if oscillator is None:
+            yield numpy.sin((index - starts[seg]) * freq_factors[seg] +
+                    phases[seg])
+        else:
+            yield oscillator.render(index - starts[seg], accs[seg], incs[seg])
+
+
+def quantize(values, amp, lowest, highest, dither, position, typecode):
+    """scales values by amp, adds the dither cycle starting at position,
+       then clips and truncates them to integers of the given typecode"""
+    dither = numpy.resize(numpy.roll(dither, -position), len(values))
+    scaled = values * amp + dither
+    numpy.clip(scaled, lowest, highest, out=scaled)
+    return scaled.astype(typecode)
@@ -13,10 +13,14 @@ setup(
     entry_points={
         'console_scripts': [
             'pysstv = pysstv.__main__:main',
+            'pysstv-batch = pysstv.batch:main',
+            'pysstv-decode = pysstv.decoder:main',
         ],
     },
     keywords='HAM SSTV slow-scan television Scottie Martin Robot Pasokon',
+    python_requires='>=3.8',
     install_requires = ['Pillow'],
+    extras_require = {'numpy': ['numpy']},
     license='MIT',
     classifiers=[
         'Development Status :: 4 - Beta',